@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'logs.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
      "corsheaders.middleware.CorsMiddleware",
@@ -66,6 +67,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests, checking them before reuse.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # WAL lets readers run while a bulk import writes; writers wait
+            # up to `timeout` seconds for the lock instead of failing at once.
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -111,6 +122,51 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Generated logbook cache: an in-process LRU, optionally backed by one of
+# the CACHES aliases (set BACKEND) so that processes share results.
+LOGBOOK_CACHE = {
+    "MAX_ENTRIES": 512,
+    "MAX_BYTES": 32 * 1024 * 1024,
+    "BACKEND": None,
+    "TIMEOUT": 24 * 60 * 60,
+}
+
+# Precomputed plans, built with `manage.py build_logbook_index` and read
+# through mmap. Trips outside the (start, stop, step) grids are simulated live.
+LOGBOOK_INDEX = {
+    "PATH": BASE_DIR / "logbook_index.bin",
+    "PICKUP_TIME": (60, 1440, 60),
+    "DRIVING_TIME": (60, 1440, 60),
+    "DISTANCE": (50, 1500, 50),
+}
+
+# Async generate_logbook (ASGI only): engine process pool, concurrent
+# simulations per server process, and queue/simulation timeouts in seconds.
+LOGBOOK_ASYNC = {
+    "WORKERS": 2,
+    "MAX_CONCURRENCY": 16,
+    "QUEUE_TIMEOUT": 5,
+    "TIMEOUT": 30,
+}
+
+# Background logbook jobs: worker threads per web process (0 to only use
+# `manage.py run_logbook_worker`), result lifetime, idle poll interval and
+# how long a running job may go without progress before it is requeued.
+LOGBOOK_JOBS = {
+    "WORKERS": 2,
+    "TTL": 24 * 60 * 60,
+    "POLL_INTERVAL": 1.0,
+    "STALE_AFTER": 5 * 60,
+}
+
+# Hours-of-service rule profiles, selected per request with "rule_profile".
+# PROFILES overrides the built-in ones or adds others, each listing the keys
+# of logs.rules.PROPERTY_70_8 it changes; all are compiled at startup.
+LOGBOOK_RULES = {
+    "DEFAULT": "property-70-8",
+    "PROFILES": {},
+}
+
 CORS_ALLOWED_ORIGINS = [
     "https://eld-generator.netlify.app",
     "http://localhost:3000"
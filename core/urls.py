@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from logs.views import prometheus_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include("logs.urls")),
+    path('metrics', prometheus_metrics, name="metrics"),
 ]
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import columnar, ledger, metrics, plans
+from .cache import logbook_cache
+from .logbook import encode_days
+from .trips import (
+    InvalidTrip,
+    check_cycle_hours,
+    read_trip,
+    simulate,
+    stored_plan,
+    trip_hash,
+    trip_key,
+)
+
+DEFAULTS = {
+    "WORKERS": 2,  # Engine processes shared by all async requests.
+    "MAX_CONCURRENCY": 16,  # Simulations running or queued at once, per event loop.
+    "QUEUE_TIMEOUT": 5,  # Seconds to wait for a free slot before answering 503.
+    "TIMEOUT": 30,  # Seconds a simulation may take before answering 504.
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+# A semaphore per event loop: an asyncio.Semaphore only works on one loop.
+_slots = weakref.WeakKeyDictionary()
+
+
+def _options():
+    return {**DEFAULTS, **getattr(settings, "LOGBOOK_ASYNC", {})}
+
+
+def engine_pool():
+    """The process pool that runs the engine, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=_options()["WORKERS"])
+    return _pool
+
+
+def _concurrency_slots():
+    loop = asyncio.get_running_loop()
+    slots = _slots.get(loop)
+    if slots is None:
+        slots = _slots[loop] = asyncio.Semaphore(_options()["MAX_CONCURRENCY"])
+    return slots
+
+
+def _error(message, status):
+    return JsonResponse({"error": message, "logbooks": []}, status=status)
+
+
+def _release_when_done(future, slots, loop):
+    def release(_):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(slots.release)
+
+    future.add_done_callback(release)
+
+
+async def _simulate(trip, slots, timeout):
+    """
+    Runs the engine for `trip` in the process pool, holding one of `slots`,
+    already acquired, until the pool is done with it.
+
+    If the client disconnects, the view is cancelled and a simulation that has
+    not started yet is dropped from the pool's queue. One that is running
+    cannot be stopped, so its slot is only given back when it finishes, even
+    after a timeout.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        future = engine_pool().submit(simulate, trip)
+    except BaseException:
+        slots.release()
+        raise
+    _release_when_done(future, slots, loop)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        future.cancel()
+        raise
+
+
+@csrf_exempt
+@require_POST
+async def generate_logbook_async(request):
+    """
+    Async variant of `generate_logbook` for the ASGI stack.
+
+    Takes the same JSON payload and returns the same response, but runs the
+    engine in a bounded process pool so long trips do not hold up the event
+    loop or the request threads. A plan that is in the in-process cache and
+    already stored by this process is answered on the event loop without a
+    thread hop; only lookups and writes that may block go to a thread.
+    """
+    route = "generate_logbook_async"
+    options = _options()
+    today = timezone.localdate()
+    cycle = None
+    try:
+        with metrics.timed(route, "parse"):
+            data = json.loads(request.body or b"{}")
+            trip = read_trip(data)
+            driver_id = ledger.read_driver_id(data)
+            driver_plan = ledger.read_driver_plan(data)
+        metrics.tag_trip_size(request, trip.total_driving_time)
+        key = trip_hash(trip)
+        with metrics.timed(route, "cycle_check"):
+            #  The driver's ledger is checked and written as by generate_logbook
+            if driver_id is not None:
+                cycle, repeat = await sync_to_async(ledger.check_cycle)(
+                    driver_id, trip, key, driver_plan, today
+                )
+            else:
+                check_cycle_hours(trip)
+    except ValueError:
+        return _error("Invalid input format. Expected numeric values.", 400)
+    except InvalidTrip as error:
+        return _error(str(error), 400)
+
+    days = logbook_cache.get_local(trip_key(trip))
+    if days is None:
+        days = await sync_to_async(stored_plan, thread_sensitive=False)(trip)
+    if days is None:
+        slots = _concurrency_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), options["QUEUE_TIMEOUT"])
+        except asyncio.TimeoutError:
+            return _error("The logbook engine is busy, please retry.", 503)
+        try:
+            with metrics.timed(route, "simulate"):
+                days = await _simulate(trip, slots, options["TIMEOUT"])
+        except asyncio.TimeoutError:
+            return _error("Generating the logbook took too long.", 504)
+        days = logbook_cache.set(trip_key(trip), days)
+
+    metrics.count_days(route, days)
+    with metrics.timed(route, "persist"):
+        if not plans.is_stored(key):
+            await sync_to_async(plans.persist)(key, trip, days)
+        if cycle is not None and not repeat:
+            cycle, driver_plan = await sync_to_async(ledger.record_plan)(
+                driver_id, key, days, cycle, today
+            )
+    with metrics.timed(route, "render"):
+        if columnar.MEDIA_TYPE in request.headers.get("Accept", ""):
+            response = JsonResponse(columnar.encode(days), content_type=columnar.MEDIA_TYPE)
+        else:
+            response = HttpResponse(encode_days(days), content_type="application/json")
+    response["X-Logbook-Plan"] = key
+    response["Content-Location"] = reverse("logentry-plan", kwargs={"plan_hash": key})
+    if cycle is not None:
+        response["X-Cycle-Remaining-Minutes"] = str(cycle.remaining_minutes(today, trip.rules))
+        response["X-Driver-Plan"] = str(driver_plan)
+    return response
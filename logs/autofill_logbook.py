@@ -1,3 +1,57 @@
+import threading
+from collections import OrderedDict, namedtuple
+from math import ceil
+
+from .logbook import LogDay, materialize
+
+
+LOG_HALF_MINUTE = 0.5
+HALF_MINUTE = 30  # In minutes.
+
+# Tick lengths in minutes the engine runs at; each divides the hour limits of
+# every rule profile, which fall on half hours. HALF_MINUTE gives the legacy
+# output.
+RESOLUTIONS = (1, 5, 15, 30)
+
+# Bump whenever the engine's output for a given Limits table changes: cached
+# and stored plans are keyed on it.
+ENGINE_VERSION = 3
+
+# The thresholds the engine enforces, compiled from an HOS rule profile (see
+# `rules.py`). Limits are in hours, except the driving before a break, which
+# is in minutes; `max_driving_minutes` and `max_on_duty_minutes` repeat the
+# hour limits in minutes for ticks under 30 minutes. `key` tells apart the
+# days and plans of different tables in the memo and the cache, and is empty
+# for LIMITS.
+Limits = namedtuple(
+    "Limits",
+    [
+        "max_sleeper_berth",
+        "resumption_time",
+        "max_driving_within_eight_hrs",
+        "max_driving_time",
+        "max_on_duty_time",
+        "max_miles_before_refueling",
+        "max_driving_minutes",
+        "max_on_duty_minutes",
+        "key",
+    ],
+)
+
+# The engine's historical limits, those of the 70-hour/8-day property profile.
+LIMITS = Limits(
+    max_sleeper_berth=10,
+    resumption_time=6.5,
+    max_driving_within_eight_hrs=7.5 * 60,
+    max_driving_time=10.5,
+    max_on_duty_time=13.5,
+    max_miles_before_refueling=980,
+    max_driving_minutes=10.5 * 60,
+    max_on_duty_minutes=13.5 * 60,
+    key="",
+)
+
+
 def auto_fill_logbook(
     duration_from_current_location_to_pickup: float,
     total_time_minutes: float,
@@ -6,65 +60,365 @@ def auto_fill_logbook(
     prev_sleeper_berth_hr: float = 0,
     miles_traveled: float = 0,
     has_arrived_at_pickup: bool = False,
-    continue_driving: bool = False
+    continue_driving: bool = False,
+    stops=None,
+    resolution_minutes: int = HALF_MINUTE,
+    limits: Limits = LIMITS,
 ):
     """
     Simulates and generates a driver's logbook based on given parameters.
     Args:
-        current_cycle_hours: Hours already used in the current cycle.
         duration_from_current_location_to_pickup: Duration in minutes to reach pickup.
         total_time_minutes: Total driving time in minutes.
         total_distance_miles: Total distance in miles.
         previous_total_time_traveled: Total time traveled from previous days.
         prev_sleeper_berth_hr: Hours spent in sleeper berth from the previous day.
+        miles_traveled: Miles driven since the last refueling.
+        has_arrived_at_pickup: Whether the pickup (the first stop) has already been made.
+        continue_driving: Whether the driver resumes straight after a full sleeper berth.
+        stops: Ordered Stop tuples to make before the drop-off. Defaults to a
+            single 30-minute pickup after `duration_from_current_location_to_pickup`.
+        resolution_minutes: Length of a simulation tick, one of RESOLUTIONS.
+            At 30 minutes every tick of driving is logged; at finer
+            resolutions a stretch of driving is logged as one segment.
+        limits: The Limits table of the HOS rule profile to plan under.
 
     Returns:
         A list of logbooks, where each logbook represents a day.
     """
 
+    return materialize(
+        fill_logbook_days(
+            duration_from_current_location_to_pickup,
+            total_time_minutes,
+            total_distance_miles,
+            previous_total_time_traveled,
+            prev_sleeper_berth_hr,
+            miles_traveled,
+            has_arrived_at_pickup,
+            continue_driving,
+            stops,
+            resolution_minutes,
+            limits,
+        )
+    )
+
+
+def fill_logbook_days(
+    duration_from_current_location_to_pickup: float,
+    total_time_minutes: float,
+    total_distance_miles: float,
+    previous_total_time_traveled: float = 0,
+    prev_sleeper_berth_hr: float = 0,
+    miles_traveled: float = 0,
+    has_arrived_at_pickup: bool = False,
+    continue_driving: bool = False,
+    stops=None,
+    resolution_minutes: int = HALF_MINUTE,
+    limits: Limits = LIMITS,
+):
+    """
+    Same as `auto_fill_logbook()`, but returns the days as compact LogDay objects.
+    """
+
+    return list(
+        iter_logbook_days(
+            duration_from_current_location_to_pickup,
+            total_time_minutes,
+            total_distance_miles,
+            previous_total_time_traveled,
+            prev_sleeper_berth_hr,
+            miles_traveled,
+            has_arrived_at_pickup,
+            continue_driving,
+            stops,
+            resolution_minutes=resolution_minutes,
+            limits=limits,
+        )
+    )
+
+
+def iter_logbook_days(
+    duration_from_current_location_to_pickup: float,
+    total_time_minutes: float,
+    total_distance_miles: float,
+    previous_total_time_traveled: float = 0,
+    prev_sleeper_berth_hr: float = 0,
+    miles_traveled: float = 0,
+    has_arrived_at_pickup: bool = False,
+    continue_driving: bool = False,
+    stops=None,
+    checkpoints=None,
+    resolution_minutes: int = HALF_MINUTE,
+    limits: Limits = LIMITS,
+):
+    """
+    Yields each day of the trip as a LogDay as soon as the day is complete.
+
+    Takes the same arguments as `auto_fill_logbook()`. Only the carry-over
+    state is kept between days, so memory does not grow with trip length.
+    If `checkpoints` is a list, the `TripState.checkpoint()` each day starts
+    from is appended to it before the day is yielded.
+    """
+
+    if stops is None:
+        stops = (Stop(duration_from_current_location_to_pickup, HALF_MINUTE, "Pickup"),)
+    state = TripState(
+        previous_total_time_traveled,
+        prev_sleeper_berth_hr,
+        miles_traveled,
+        1 if has_arrived_at_pickup else 0,
+        continue_driving,
+    )
+    while not state.finished:
+        if checkpoints is not None:
+            checkpoints.append(state.checkpoint(stops))
+        yield day_memo.fill_day(
+            state, stops, total_time_minutes, total_distance_miles, resolution_minutes, limits
+        )
+
+
+class Stop(namedtuple("Stop", ["arrival", "dwell", "action"])):
+    """
+    A stop on the way to the drop-off.
+
+    `arrival` is the driving time from the start of the trip in minutes,
+    `dwell` the minutes spent on duty there and `action` the logbook label.
+    """
+
+    __slots__ = ()
+
+
+class TripState:
+    """
+    Carry-over between two days of a trip.
+
+    `fill_day()` reads it at the start of a day and rewrites it when the day
+    ends, so a trip of any length is simulated with a single state object.
+    """
+
+    __slots__ = (
+        "total_time_traveled",
+        "prev_sleeper_berth_hr",
+        "miles_traveled",
+        "next_stop",
+        "continue_driving",
+        "finished",
+        "lookahead",
+    )
+
+    def __init__(
+        self,
+        total_time_traveled=0,
+        prev_sleeper_berth_hr=0,
+        miles_traveled=0,
+        next_stop=0,
+        continue_driving=False,
+    ):
+        self.total_time_traveled = total_time_traveled
+        self.prev_sleeper_berth_hr = prev_sleeper_berth_hr
+        self.miles_traveled = miles_traveled
+        self.next_stop = next_stop
+        self.continue_driving = continue_driving
+        self.finished = False
+        # How far the last day was simulated to, in time traveled: past its
+        # end when it was planned again from its start (see `fill_day()`).
+        self.lookahead = 0
+
+    def checkpoint(self, stops):
+        """
+        The carry-over as plain data, with the stops still to make.
+
+        Passing these back to `iter_logbook_days()` (`stops` included, and
+        `has_arrived_at_pickup` left False) simulates the rest of the trip
+        exactly as the remaining days of the original run.
+        """
+        return {
+            "previous_total_time_traveled": self.total_time_traveled,
+            "prev_sleeper_berth_hr": self.prev_sleeper_berth_hr,
+            "miles_traveled": self.miles_traveled,
+            "continue_driving": self.continue_driving,
+            "stops": [list(stop) for stop in stops[self.next_stop:]],
+        }
+
+    def start_next_day(
+        self,
+        total_time_traveled,
+        prev_sleeper_berth_hr,
+        miles_traveled,
+        next_stop,
+        continue_driving,
+    ):
+        self.total_time_traveled = total_time_traveled
+        self.prev_sleeper_berth_hr = prev_sleeper_berth_hr
+        self.miles_traveled = miles_traveled
+        self.next_stop = next_stop
+        self.continue_driving = continue_driving
+
+
+class DayMemo:
+    """
+    Bounded memo of whole days, keyed on the carry-over they start from.
+
+    Apart from where the next stop or the drop-off falls, a day depends only
+    on the carry-over and the miles driven per tick. A day that neither
+    reaches a stop nor ends the trip is reused for any later day with the same
+    carry-over that is at least as far from its next stop or drop-off, or
+    from as far as the day was simulated to (see `TripState.lookahead`). The
+    reused day is shifted to the new time traveled. Days are built as
+    `day_class` objects, which must provide `copy()`.
+    """
+
+    def __init__(self, max_entries=4096, day_class=LogDay):
+        self.max_entries = max_entries
+        self.day_class = day_class
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fill_day(
+        self,
+        state,
+        stops,
+        total_time_minutes,
+        total_distance_miles,
+        tick=HALF_MINUTE,
+        limits=LIMITS,
+    ):
+        """Same as the module-level `fill_day()`, reusing a memoized day when possible."""
+        key = day_key(state, total_time_minutes, total_distance_miles, tick, limits)
+        start = state.total_time_traveled
+        limit = leg_end(state, stops, total_time_minutes)
+
+        with self._lock:
+            memo = self._days.get(key)
+            if memo is not None and limit - start > memo[2]:
+                self._days.move_to_end(key)
+                self.hits += 1
+            else:
+                memo = None
+                self.misses += 1
+
+        if memo is not None:
+            day, time_traveled, reach, carry_over = memo
+            state.start_next_day(start + time_traveled, *carry_over)
+            state.lookahead = start + reach
+            return day.copy(start)
+
+        state.lookahead = 0
+        day = fill_day(
+            state, stops, total_time_minutes, total_distance_miles, self.day_class, tick, limits
+        )
+        if not state.finished and state.next_stop == key[3]:
+            carry_over = (
+                state.prev_sleeper_berth_hr,
+                state.miles_traveled,
+                state.next_stop,
+                state.continue_driving,
+            )
+            with self._lock:
+                # The day only holds for trips that drive on at least as far
+                # as it was simulated to.
+                time_traveled = state.total_time_traveled - start
+                reach = max(time_traveled, state.lookahead - start)
+                self._days[key] = (day, time_traveled, reach, carry_over)
+                self._days.move_to_end(key)
+                if len(self._days) > self.max_entries:
+                    self._days.popitem(last=False)
+        return day
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._days),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def day_key(state, total_time_minutes, total_distance_miles, tick=HALF_MINUTE, limits=LIMITS):
+    """
+    What a day depends on besides where its leg ends: the miles per tick, the
+    carry-over it starts from (`key[1:5]`), the tick length and the limits.
+    """
+    return (
+        (total_distance_miles / total_time_minutes) * tick,
+        state.prev_sleeper_berth_hr,
+        state.miles_traveled,
+        state.next_stop,
+        state.continue_driving,
+        tick,
+        limits.key,
+    )
+
+
+def leg_end(state, stops, total_time_minutes):
+    """Minutes of driving at which the current leg ends: the next stop or the drop-off."""
+    if state.next_stop < len(stops):
+        return stops[state.next_stop].arrival
+    return total_time_minutes
+
+
+day_memo = DayMemo()
+
+
+def fill_day(
+    state: TripState,
+    stops,
+    total_time_minutes: float,
+    total_distance_miles: float,
+    day_class=LogDay,
+    tick=HALF_MINUTE,
+    limits=LIMITS,
+    rest_until_midnight=False,
+):
+    """
+    Simulates a single day of the trip, starting from the carry-over in `state`.
+
+    Returns the day's logbook, an instance of `day_class`. `state` is left
+    holding the carry-over for the next day, or is marked finished once the
+    drop-off has been logged. The clock advances by `tick` minutes of driving
+    at a time, and the HOS rules are enforced with the thresholds of `limits`.
+
+    When the driving limit is reached with more than the sleeper-berth period
+    left in the day, the driver rests for that period and drives on. If that
+    would carry the day past midnight, the day is simulated again with
+    `rest_until_midnight`, resting until midnight instead.
+    """
+
     driving_time = total_time_minutes
     prev_time_spent_in_driving = 0
     time_traveled_within_eight_hrs = 0
     current_on_duty_hour = 0
-    continue_driving_from_prev_day = continue_driving
+    prev_sleeper_berth_hr = state.prev_sleeper_berth_hr
+    miles_traveled = state.miles_traveled
+    next_stop = state.next_stop
+    continue_driving_from_prev_day = state.continue_driving
 
     time_spent_in_off_duty = 0
     time_spent_in_on_duty = 0
     time_spent_in_driving = 0
     time_spent_in_sleeper_berth = 0
 
-    LOG_HALF_MINUTE = 0.5
-    MAX_SLEEPER_BERTH = 10
-    MAX_DRIVING_WITHIN_EIGHT_HRS = 7.5 * 60
-    MAX_DRIVING_TIME = 10.5
-    MAX_MILES_BEFORE_REFUELING = 980
-    MAX_ON_DUTY_TIME = 13.5
-    RESUMPTION_TIME = 6.5
-
-    logbooks = []
-    total_time_traveled = previous_total_time_traveled
+    total_time_traveled = state.total_time_traveled
     current_hour = 0
+    rested_before_midnight = False
 
-    def generate_new_log():
-        return {
-            "logbook": [],
-            "currentHour": 0,
-            "totalTimeTraveled": total_time_traveled,
-            "timeSpentInOffDuty": time_spent_in_off_duty,
-            "timeSpentInOnDuty": time_spent_in_on_duty,
-            "timeSpentInDriving": time_spent_in_driving,
-            "timeSpentInSleeperBerth": time_spent_in_sleeper_berth,
-        }
-
-    new_log = generate_new_log()
-    logbooks.append(new_log)
+    new_log = day_class(total_time_traveled)
 
     #Handling start of logging logic:
    
-    if 0 < prev_sleeper_berth_hr < MAX_SLEEPER_BERTH: # FIRST SCENARIO:
+    if 0 < prev_sleeper_berth_hr < limits.max_sleeper_berth: # FIRST SCENARIO:
 
         # Step 1: Start at sleeper berth until you have spent 10 hours there
-        sleeper_time = MAX_SLEEPER_BERTH - prev_sleeper_berth_hr
+        sleeper_time = limits.max_sleeper_berth - prev_sleeper_berth_hr
         current_hour, current_on_duty_hour, time_spent_in_sleeper_berth = (
             switch_to_sleeper_berth(
                 new_log,
@@ -72,6 +426,7 @@ def auto_fill_logbook(
                 current_on_duty_hour,
                 time_spent_in_sleeper_berth,
                 rate=sleeper_time,
+                tick=tick,
             )
         )
         # Step 2: Switch to On-Duty (Vehicle Check)
@@ -81,6 +436,7 @@ def auto_fill_logbook(
             current_on_duty_hour,
             time_spent_in_on_duty,
             action="Pre-trip/TIV",
+            tick=tick,
         )
 
         # Step 4: Start Driving to Pickup or drop-off
@@ -101,6 +457,7 @@ def auto_fill_logbook(
             miles_traveled,
             total_distance_miles,
             driving_time,
+            tick,
         )
     else:
         if not continue_driving_from_prev_day: # SECOND SCENARIO: FIRST DAY OF DUTY
@@ -110,8 +467,9 @@ def auto_fill_logbook(
                 new_log,
                 current_hour,
                 time_spent_in_off_duty,
-                rate=RESUMPTION_TIME,
+                rate=limits.resumption_time,
                 action=None,
+                tick=tick,
             )
 
             # Step 2: Switch to On-Duty (Vehicle Check)
@@ -121,6 +479,7 @@ def auto_fill_logbook(
                 current_on_duty_hour,
                 time_spent_in_on_duty,
                 action="Pre-trip/TIV",
+                tick=tick,
             )
             # Step 3: Start Driving to Pickup or drop-off
             (
@@ -140,6 +499,7 @@ def auto_fill_logbook(
                 miles_traveled,
                 total_distance_miles,
                 driving_time,
+                tick,
             )
         else: # THIRD SCENARIO: CONTINUE DRIVING FROM THE PREVIOUS DAY
              # Step 1: Perform pre-trip operations
@@ -149,6 +509,7 @@ def auto_fill_logbook(
                 current_on_duty_hour,
                 time_spent_in_on_duty,
                 action="Pre-trip/TIV",
+                tick=tick,
             )
              # Step 2: Start driving
              (
@@ -168,47 +529,18 @@ def auto_fill_logbook(
                 miles_traveled,
                 total_distance_miles,
                 driving_time,
+                tick,
             )
 
-    while (
-        total_time_traveled < duration_from_current_location_to_pickup
-        and not has_arrived_at_pickup
-    ):
-        # Base Condition: Stop Recursion if pickup location is reached.
-        if total_time_traveled >= duration_from_current_location_to_pickup:
-
-            break
-        (
-            current_hour,
-            current_on_duty_hour,
-            time_spent_in_driving,
-            total_time_traveled,
-            time_traveled_within_eight_hrs,
-            miles_traveled,
-        ) = drive(
-            new_log,
-            current_hour,
-            current_on_duty_hour,
-            time_spent_in_driving,
-            total_time_traveled,
-            time_traveled_within_eight_hrs,
-            miles_traveled,
-            total_distance_miles,
-            driving_time,
-        )
-
-        # Mandatory 30-min break after at least every 8 hours of driving
-        if time_traveled_within_eight_hrs >= MAX_DRIVING_WITHIN_EIGHT_HRS:
-            time_traveled_within_eight_hrs = 0
-
-            current_hour, time_spent_in_off_duty = switch_to_off_duty(
-                new_log,
-                current_hour,
-                time_spent_in_off_duty,
-                rate=LOG_HALF_MINUTE,
-                action="30-minute break",
-            )
+    # Drive each leg: to every stop in turn, then on to the drop-off.
+    while True:
+        if next_stop < len(stops):
+            arrival = stops[next_stop].arrival
+        else:
+            arrival = driving_time
 
+        while total_time_traveled < arrival:
+            # Skip straight to the next tick on which a duty-status rule fires.
             (
                 current_hour,
                 current_on_duty_hour,
@@ -216,7 +548,7 @@ def auto_fill_logbook(
                 total_time_traveled,
                 time_traveled_within_eight_hrs,
                 miles_traveled,
-            ) = start_driving(
+            ) = cruise(
                 new_log,
                 current_hour,
                 current_on_duty_hour,
@@ -226,21 +558,13 @@ def auto_fill_logbook(
                 miles_traveled,
                 total_distance_miles,
                 driving_time,
+                until=arrival,
+                tick=tick,
+                limits=limits,
             )
-
-        # Refuelling
-        if miles_traveled >= MAX_MILES_BEFORE_REFUELING:
-            current_hour, current_on_duty_hour, time_spent_in_on_duty = (
-                switch_to_on_duty(
-                    new_log,
-                    current_hour,
-                    current_on_duty_hour,
-                    time_spent_in_on_duty,
-                    action="Refueling",
-                )
-            )
-            miles_traveled = 0
-            time_traveled_within_eight_hrs = 0
+            # Base Condition: Stop driving once the stop or drop-off is reached
+            if total_time_traveled >= arrival:
+                break
             (
                 current_hour,
                 current_on_duty_hour,
@@ -248,7 +572,7 @@ def auto_fill_logbook(
                 total_time_traveled,
                 time_traveled_within_eight_hrs,
                 miles_traveled,
-            ) = start_driving(
+            ) = drive(
                 new_log,
                 current_hour,
                 current_on_duty_hour,
@@ -258,111 +582,211 @@ def auto_fill_logbook(
                 miles_traveled,
                 total_distance_miles,
                 driving_time,
+                tick,
             )
-        # Comply with maximum 11-hour driving period
-        if time_spent_in_driving >= MAX_DRIVING_TIME:
-            sleeper_time = 24 - current_hour
-            actual_sleeper = 10 if sleeper_time > 10 else sleeper_time
-            prev_time_spent_in_driving += time_spent_in_driving #save time spent in driving before resetting.
-           
-            time_spent_in_driving = 0 # reset time spent in driving here.
 
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-            ) = switch_to_sleeper_berth(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-                rate=actual_sleeper,
-            )
-                        
-            if sleeper_time < 10:
-                new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-                new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-                new_log["timeSpentInDriving"] = time_spent_in_driving + prev_time_spent_in_driving
-                new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
-
-                next_day_logs = auto_fill_logbook(
-                    duration_from_current_location_to_pickup,
-                    driving_time,  # Remaining total trip time
-                    total_distance_miles,
-                    total_time_traveled,  # Keep tracking time across days
-                    sleeper_time,
-                    miles_traveled,
-                    has_arrived_at_pickup=False,
-                    continue_driving = False
+            # Mandatory 30-min break after at least every 8 hours of driving
+            if time_traveled_within_eight_hrs >= limits.max_driving_within_eight_hrs:
+                time_traveled_within_eight_hrs = 0
+                current_hour, time_spent_in_off_duty = switch_to_off_duty(
+                    new_log,
+                    current_hour,
+                    time_spent_in_off_duty,
+                    rate=LOG_HALF_MINUTE,
+                    action="30-minute break",
+                    tick=tick,
                 )
 
-                return logbooks + next_day_logs  # Combine all logbooks
-            elif sleeper_time == 10:
-                new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-                new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-                new_log["timeSpentInDriving"] = time_spent_in_driving + prev_time_spent_in_driving
-                new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
-
-                next_day_logs = auto_fill_logbook(
-                    duration_from_current_location_to_pickup,
-                    driving_time,  # Remaining total trip time
-                    total_distance_miles,
-                    total_time_traveled,  # Keep tracking time across days
-                    sleeper_time,
+                (
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_driving,
+                    total_time_traveled,
+                    time_traveled_within_eight_hrs,
+                    miles_traveled,
+                ) = start_driving(
+                    new_log,
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_driving,
+                    total_time_traveled,
+                    time_traveled_within_eight_hrs,
                     miles_traveled,
-                    has_arrived_at_pickup=False,
-                    continue_driving = True
+                    total_distance_miles,
+                    driving_time,
+                    tick,
                 )
 
-                return logbooks + next_day_logs  # Combine all logbooks
+            # Refuelling
+            if miles_traveled >= limits.max_miles_before_refueling:
+                current_hour, current_on_duty_hour, time_spent_in_on_duty = (
+                    switch_to_on_duty(
+                        new_log,
+                        current_hour,
+                        current_on_duty_hour,
+                        time_spent_in_on_duty,
+                        action="Refueling",
+                        tick=tick,
+                    )
+                )
+                miles_traveled = 0
+                time_traveled_within_eight_hrs = 0
+                (
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_driving,
+                    total_time_traveled,
+                    time_traveled_within_eight_hrs,
+                    miles_traveled,
+                ) = start_driving(
+                    new_log,
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_driving,
+                    total_time_traveled,
+                    time_traveled_within_eight_hrs,
+                    miles_traveled,
+                    total_distance_miles,
+                    driving_time,
+                    tick,
+                )
 
+             # Comply with maximum 11-hour driving period 
+            if time_spent_in_driving >= limits.max_driving_time:
+                if rested_before_midnight and current_hour > 24:
+                    return _rest_until_midnight(
+                        state,
+                        total_time_traveled,
+                        stops,
+                        total_time_minutes,
+                        total_distance_miles,
+                        day_class,
+                        tick,
+                        limits,
+                    )
+                sleeper_time = 24 - current_hour
+                prev_time_spent_in_driving += time_spent_in_driving # save time spent in driving before resetting.
+           
+                time_spent_in_driving = 0 # reset time spent in driving here.
+            
+                if rest_until_midnight:
+                    actual_sleeper = sleeper_time
+                else:
+                    actual_sleeper = min(sleeper_time, limits.max_sleeper_berth)
 
-        # Comply with maximum 14-hour on duty period
-        if current_on_duty_hour >= MAX_ON_DUTY_TIME:
-            sleeper_time = 24 - current_hour
+                (
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_sleeper_berth,
+                ) = switch_to_sleeper_berth(
+                    new_log,
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_sleeper_berth,
+                    rate=actual_sleeper,
+                    tick=tick,
+                )
+           
+            
+                if sleeper_time < limits.max_sleeper_berth:
+                    new_log.set_totals(
+                        time_spent_in_off_duty,
+                        time_spent_in_on_duty,
+                        prev_time_spent_in_driving + time_spent_in_driving,
+                        time_spent_in_sleeper_berth,
+                    )
+
+                    state.start_next_day(
+                        total_time_traveled,  # Keep tracking time across days
+                        sleeper_time,
+                        miles_traveled,
+                        next_stop=next_stop,
+                        continue_driving=False,
+                    )
+                    return new_log
+                elif sleeper_time == limits.max_sleeper_berth or rest_until_midnight:
+                    new_log.set_totals(
+                        time_spent_in_off_duty,
+                        time_spent_in_on_duty,
+                        prev_time_spent_in_driving + time_spent_in_driving,
+                        time_spent_in_sleeper_berth,
+                    )
+
+                    state.start_next_day(
+                        total_time_traveled,  # Keep tracking time across days
+                        sleeper_time,
+                        miles_traveled,
+                        next_stop=next_stop,
+                        continue_driving=True,
+                    )
+                    return new_log
+                # Rested the sleeper-berth period with more of the day left:
+                # drive on, unless that crosses midnight (see above).
+                rested_before_midnight = True
+             # Comply with maximum 14-hour on duty period
+            if current_on_duty_hour >= limits.max_on_duty_time:
+                if rested_before_midnight and current_hour > 24:
+                    return _rest_until_midnight(
+                        state,
+                        total_time_traveled,
+                        stops,
+                        total_time_minutes,
+                        total_distance_miles,
+                        day_class,
+                        tick,
+                        limits,
+                    )
+            
+                sleeper_time = 24 - current_hour
 
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-            ) = switch_to_sleeper_berth(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-                rate=sleeper_time,
-            )
+                (
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_sleeper_berth,
+                ) = switch_to_sleeper_berth(
+                    new_log,
+                    current_hour,
+                    current_on_duty_hour,
+                    time_spent_in_sleeper_berth,
+                    rate=sleeper_time,
+                    tick=tick,
+                )
 
-            new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-            new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-            new_log["timeSpentInDriving"] = time_spent_in_driving + prev_time_spent_in_driving
-            new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
+                new_log.set_totals(
+                    time_spent_in_off_duty,
+                    time_spent_in_on_duty,
+                    time_spent_in_driving + prev_time_spent_in_driving,
+                    time_spent_in_sleeper_berth,
+                )
 
-            next_day_logs = auto_fill_logbook(
-                duration_from_current_location_to_pickup,
-                driving_time,  # Remaining total trip time
-                total_distance_miles,
-                total_time_traveled,  # Keep tracking time across days
-                sleeper_time,
-                miles_traveled,
-                has_arrived_at_pickup=False,
-            )
+                # Start a New Day & Continue Logging
+                state.start_next_day(
+                    total_time_traveled,  # Keep tracking time across days
+                    sleeper_time,
+                    miles_traveled,
+                    next_stop=next_stop,
+                    continue_driving=False,
+                )
+                return new_log
 
-            return logbooks + next_day_logs  # Combine all logbooks
+        if next_stop == len(stops):
+            break
 
-        # Step 5: Arrive at Pickup, Stay On-Duty for 30 minutes
-    if not has_arrived_at_pickup:
+        # Arrive at the stop and stay on duty for its dwell time
+        stop = stops[next_stop]
         current_hour, current_on_duty_hour, time_spent_in_on_duty = switch_to_on_duty(
             new_log,
             current_hour,
             current_on_duty_hour,
             time_spent_in_on_duty,
-            action="Pickup",
+            action=stop.action,
+            rate=stop.dwell / 60,
+            tick=tick,
         )
-        has_arrived_at_pickup = True
+        next_stop += 1
         time_traveled_within_eight_hrs = 0
 
-        # Step 6: Start Driving to Drop-off Immediately
+        # Start driving to the next stop or the drop-off immediately
         (
             current_hour,
             current_on_duty_hour,
@@ -380,187 +804,9 @@ def auto_fill_logbook(
             miles_traveled,
             total_distance_miles,
             driving_time,
+            tick,
         )
 
-    # Step 7: Continue Driving to Drop-off
-    while total_time_traveled < driving_time:
-        # Base Condition: Stop Recursion if Trip is Done
-        if total_time_traveled >= driving_time:
-            break  # Trip is complete, return logs
-        (
-            current_hour,
-            current_on_duty_hour,
-            time_spent_in_driving,
-            total_time_traveled,
-            time_traveled_within_eight_hrs,
-            miles_traveled,
-        ) = drive(
-            new_log,
-            current_hour,
-            current_on_duty_hour,
-            time_spent_in_driving,
-            total_time_traveled,
-            time_traveled_within_eight_hrs,
-            miles_traveled,
-            total_distance_miles,
-            driving_time,
-        )
-
-        # Mandatory 30-min break after at least every 8 hours of driving
-        if time_traveled_within_eight_hrs >= MAX_DRIVING_WITHIN_EIGHT_HRS:
-            time_traveled_within_eight_hrs = 0
-            current_hour, time_spent_in_off_duty = switch_to_off_duty(
-                new_log,
-                current_hour,
-                time_spent_in_off_duty,
-                rate=LOG_HALF_MINUTE,
-                action="30-minute break",
-            )
-
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_driving,
-                total_time_traveled,
-                time_traveled_within_eight_hrs,
-                miles_traveled,
-            ) = start_driving(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_driving,
-                total_time_traveled,
-                time_traveled_within_eight_hrs,
-                miles_traveled,
-                total_distance_miles,
-                driving_time,
-            )
-
-        # Refuelling
-        if miles_traveled >= MAX_MILES_BEFORE_REFUELING:
-            current_hour, current_on_duty_hour, time_spent_in_on_duty = (
-                switch_to_on_duty(
-                    new_log,
-                    current_hour,
-                    current_on_duty_hour,
-                    time_spent_in_on_duty,
-                    action="Refueling",
-                )
-            )
-            miles_traveled = 0
-            time_traveled_within_eight_hrs = 0
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_driving,
-                total_time_traveled,
-                time_traveled_within_eight_hrs,
-                miles_traveled,
-            ) = start_driving(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_driving,
-                total_time_traveled,
-                time_traveled_within_eight_hrs,
-                miles_traveled,
-                total_distance_miles,
-                driving_time,
-            )
-
-         # Comply with maximum 11-hour driving period 
-        if time_spent_in_driving >= MAX_DRIVING_TIME:
-            sleeper_time = 24 - current_hour
-            prev_time_spent_in_driving += time_spent_in_driving # save time spent in driving before resetting.
-           
-            time_spent_in_driving = 0 # reset time spent in driving here.
-            
-            actual_sleeper = 10 if sleeper_time > 10 else sleeper_time
-
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-            ) = switch_to_sleeper_berth(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-                rate=actual_sleeper,
-            )
-           
-            
-            if sleeper_time < 10:
-                new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-                new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-                new_log["timeSpentInDriving"] = prev_time_spent_in_driving + time_spent_in_driving
-                new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
-
-                next_day_logs = auto_fill_logbook(
-                    duration_from_current_location_to_pickup,
-                    driving_time,  # Remaining total trip time
-                    total_distance_miles,
-                    total_time_traveled,  # Keep tracking time across days
-                    sleeper_time,
-                    miles_traveled,
-                    has_arrived_at_pickup=True,
-                    continue_driving = False
-                )
-
-                return logbooks + next_day_logs  # Combine all logbooks
-            elif sleeper_time == 10:
-                new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-                new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-                new_log["timeSpentInDriving"] = prev_time_spent_in_driving + time_spent_in_driving
-                new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
-
-                next_day_logs = auto_fill_logbook(
-                    duration_from_current_location_to_pickup,
-                    driving_time,  # Remaining total trip time
-                    total_distance_miles,
-                    total_time_traveled,  # Keep tracking time across days
-                    sleeper_time,
-                    miles_traveled,
-                    has_arrived_at_pickup=True,
-                    continue_driving = True
-                )
-
-                return logbooks + next_day_logs  # Combine all logbooks
-         # Comply with maximum 14-hour on duty period
-        if current_on_duty_hour >= MAX_ON_DUTY_TIME:
-            
-            sleeper_time = 24 - current_hour
-
-            (
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-            ) = switch_to_sleeper_berth(
-                new_log,
-                current_hour,
-                current_on_duty_hour,
-                time_spent_in_sleeper_berth,
-                rate=sleeper_time,
-            )
-
-            new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-            new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-            new_log["timeSpentInDriving"] = time_spent_in_driving + prev_time_spent_in_driving
-            new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
-
-            # Start a New Day & Continue Logging (Recursive Call)
-            next_day_logs = auto_fill_logbook(
-                duration_from_current_location_to_pickup,  
-                driving_time,  # total trip time
-                total_distance_miles,
-                total_time_traveled,  # Keep tracking time across days
-                sleeper_time,
-                miles_traveled,
-                has_arrived_at_pickup,
-            )
-
-            return logbooks + next_day_logs  # Combine all logbooks
-
     # Step 8: On-Duty at Drop-off before Sleeping
     current_hour, current_on_duty_hour, time_spent_in_on_duty = switch_to_on_duty(
         new_log,
@@ -568,7 +814,19 @@ def auto_fill_logbook(
         current_on_duty_hour,
         time_spent_in_on_duty,
         action="Drop-off",
+        tick=tick,
     )
+    if rested_before_midnight and current_hour > 24:
+        return _rest_until_midnight(
+            state,
+            total_time_traveled,
+            stops,
+            total_time_minutes,
+            total_distance_miles,
+            day_class,
+            tick,
+            limits,
+        )
     time_traveled_within_eight_hrs = 0
 
     # Step 9: Switch to off-duty (End of the Trip)
@@ -579,39 +837,59 @@ def auto_fill_logbook(
         time_spent_in_off_duty,
         rate=remaining_hour,
         action=None,
+        tick=tick,
     )
 
-    new_log["timeSpentInOffDuty"] = time_spent_in_off_duty
-    new_log["timeSpentInOnDuty"] = time_spent_in_on_duty
-    new_log["timeSpentInDriving"] = time_spent_in_driving + prev_time_spent_in_driving
-    new_log["timeSpentInSleeperBerth"] = time_spent_in_sleeper_berth
+    new_log.set_totals(
+        time_spent_in_off_duty,
+        time_spent_in_on_duty,
+        time_spent_in_driving + prev_time_spent_in_driving,
+        time_spent_in_sleeper_berth,
+    )
 
-    return logbooks  # Return multiple days of logs
+    state.finished = True
+    return new_log
 
 
 # ===================================== HELPER FUNCTIONS =======================================================
 
-LOG_HALF_MINUTE = 0.5
-HALF_MINUTE = 30  # In minutes.
+
+def _rest_until_midnight(state, total_time_traveled, *args):
+    """
+    Plans the day of `fill_day()` again, resting until midnight once the
+    driving limit is reached. `total_time_traveled` is how far the first
+    attempt drove; whether it crossed midnight depended on the trip not
+    ending before then, so it is kept in `state.lookahead` for `DayMemo`.
+    """
+    state.lookahead = max(state.lookahead, total_time_traveled)
+    return fill_day(state, *args, rest_until_midnight=True)
 
 
 def switch_to_on_duty(
-    log, current_hour, current_on_duty_hour, time_spent_in_on_duty, action
+    log,
+    current_hour,
+    current_on_duty_hour,
+    time_spent_in_on_duty,
+    action,
+    rate=LOG_HALF_MINUTE,
+    tick=HALF_MINUTE,
 ):
-    log["logbook"].append({"hour": current_hour, "row": "on-duty"})
-    current_hour += LOG_HALF_MINUTE
-    current_on_duty_hour += LOG_HALF_MINUTE
-    time_spent_in_on_duty += LOG_HALF_MINUTE
-    log["logbook"].append({"hour": current_hour, "row": "on-duty", "action": action})
+    log.mark(current_hour, "on-duty")
+    current_hour = _add_hours(current_hour, rate, tick)
+    current_on_duty_hour = _add_hours(current_on_duty_hour, rate, tick)
+    time_spent_in_on_duty = _add_hours(time_spent_in_on_duty, rate, tick)
+    log.mark(current_hour, "on-duty", action)
     return current_hour, current_on_duty_hour, time_spent_in_on_duty
 
 
-def switch_to_off_duty(log, current_hour, time_spent_in_off_duty, rate, action):
-    log["logbook"].append({"hour": current_hour, "row": "off-duty"})
-    current_hour += rate
-    time_spent_in_off_duty += rate
+def switch_to_off_duty(
+    log, current_hour, time_spent_in_off_duty, rate, action, tick=HALF_MINUTE
+):
+    log.mark(current_hour, "off-duty")
+    current_hour = _add_hours(current_hour, rate, tick)
+    time_spent_in_off_duty = _add_hours(time_spent_in_off_duty, rate, tick)
 
-    log["logbook"].append({"hour": current_hour, "row": "off-duty", "action": action})
+    log.mark(current_hour, "off-duty", action)
     return current_hour, time_spent_in_off_duty
 
 
@@ -621,14 +899,15 @@ def switch_to_sleeper_berth(
     current_on_duty_hour,
     time_spent_in_sleeper_berth,
     rate,
+    tick=HALF_MINUTE,
 ):
-    log["logbook"].append({"hour": current_hour, "row": "sleeper"})
-    current_hour += rate
-    time_spent_in_sleeper_berth += rate
+    log.mark(current_hour, "sleeper")
+    current_hour = _add_hours(current_hour, rate, tick)
+    time_spent_in_sleeper_berth = _add_hours(time_spent_in_sleeper_berth, rate, tick)
     current_on_duty_hour = 0
     
 
-    log["logbook"].append({"hour": current_hour, "row": "sleeper"})
+    log.mark(current_hour, "sleeper")
     return (
         current_hour,
         current_on_duty_hour,
@@ -646,18 +925,19 @@ def start_driving(
     miles_traveled,
     total_distance_miles,
     driving_time,
+    tick=HALF_MINUTE,
 ):
-    log["logbook"].append({"hour": current_hour, "row": "driving"})
-    current_hour += LOG_HALF_MINUTE
-    current_on_duty_hour += LOG_HALF_MINUTE
-    time_spent_in_driving += LOG_HALF_MINUTE
-    total_time_traveled += HALF_MINUTE
-    time_traveled_within_eight_hrs += HALF_MINUTE
+    log.mark(current_hour, "driving")
+    current_hour = _advance(current_hour, 1, tick)
+    current_on_duty_hour = _advance(current_on_duty_hour, 1, tick)
+    time_spent_in_driving = _advance(time_spent_in_driving, 1, tick)
+    total_time_traveled += tick
+    time_traveled_within_eight_hrs += tick
     miles_traveled += (
         total_distance_miles / driving_time
-    ) * HALF_MINUTE  # Convert minutes to miles
+    ) * tick  # Convert minutes to miles
     
-    log["logbook"].append({"hour": current_hour, "row": "driving"})
+    log.mark(current_hour, "driving")
     return (
         current_hour,
         current_on_duty_hour,
@@ -678,18 +958,22 @@ def drive(
     miles_traveled,
     total_distance_miles,
     driving_time,
+    tick=HALF_MINUTE,
 ):
-    current_hour += LOG_HALF_MINUTE
-    current_on_duty_hour += LOG_HALF_MINUTE
-    total_time_traveled += HALF_MINUTE
-    time_traveled_within_eight_hrs += HALF_MINUTE
-    time_spent_in_driving += LOG_HALF_MINUTE
+    current_hour = _advance(current_hour, 1, tick)
+    current_on_duty_hour = _advance(current_on_duty_hour, 1, tick)
+    total_time_traveled += tick
+    time_traveled_within_eight_hrs += tick
+    time_spent_in_driving = _advance(time_spent_in_driving, 1, tick)
     miles_traveled += (
         total_distance_miles / driving_time
-    ) * HALF_MINUTE  # Convert minutes to miles
+    ) * tick  # Convert minutes to miles
   
 
-    log["logbook"].append({"hour": current_hour, "row": "driving"})
+    if tick == HALF_MINUTE:
+        log.mark(current_hour, "driving")
+    else:
+        log.extend_driving(current_hour)
     return (
         current_hour,
         current_on_duty_hour,
@@ -698,3 +982,176 @@ def drive(
         time_traveled_within_eight_hrs,
         miles_traveled,
     )
+
+
+def _advance(hours, ticks, tick):
+    """
+    `hours` plus `ticks` ticks of `tick` minutes. Below 30-minute ticks the
+    result is snapped to whole minutes, so the hour limits are reached on
+    the exact tick despite float rounding.
+    """
+    if tick == HALF_MINUTE:
+        return hours + ticks * LOG_HALF_MINUTE
+    return round(hours * 60 + ticks * tick) / 60
+
+
+def _add_hours(hours, rate, tick):
+    """`hours + rate`, snapped to whole minutes like `_advance()` does."""
+    if tick == HALF_MINUTE:
+        return hours + rate
+    return round((hours + rate) * 60) / 60
+
+
+def _fuel_ticks(miles_traveled, miles_per_tick, limit, ticks):
+    """
+    How many of the next `ticks` driving ticks pass before the one on which
+    the odometer reaches `limit`, and the reading after them.
+
+    The readings are accumulated one tick at a time, exactly like `drive()`
+    does, so the threshold is crossed on the same tick. `ticks` is already
+    bounded by the daily driving limit, so this stays a few dozen additions.
+    """
+    miles = miles_traveled
+    for advanced in range(ticks):
+        reading = miles + miles_per_tick
+        if reading >= limit:
+            return advanced, miles
+        miles = reading
+    return ticks, miles
+
+
+def _ticks_until(value, step, limit):
+    """Number of ticks of `step` before `value` reaches `limit` (at least one)."""
+    return max(1, ceil((limit - value) / step))
+
+
+def cruise(
+    log,
+    current_hour,
+    current_on_duty_hour,
+    time_spent_in_driving,
+    total_time_traveled,
+    time_traveled_within_eight_hrs,
+    miles_traveled,
+    total_distance_miles,
+    driving_time,
+    until,
+    tick=HALF_MINUTE,
+    limits=LIMITS,
+):
+    """
+    Drives through every tick on which nothing but the clock changes.
+
+    Works out analytically how many ticks are left before the 30-minute break,
+    refueling, the 11-hour driving limit or the 14-hour duty window comes due,
+    or before `until` minutes of travel are reached, and advances the state
+    past all of them at once. The tick on which a rule fires is left to the
+    caller, so the logbook is identical to calling `drive()` tick by tick.
+    Below 30-minute ticks the whole stretch becomes one driving segment.
+    """
+    if total_time_traveled >= until:
+        return (
+            current_hour,
+            current_on_duty_hour,
+            time_spent_in_driving,
+            total_time_traveled,
+            time_traveled_within_eight_hrs,
+            miles_traveled,
+        )
+
+    miles_per_tick = (total_distance_miles / driving_time) * tick
+    if tick != HALF_MINUTE:
+        return _cruise_minutes(
+            log,
+            current_hour,
+            current_on_duty_hour,
+            time_spent_in_driving,
+            total_time_traveled,
+            time_traveled_within_eight_hrs,
+            miles_traveled,
+            miles_per_tick,
+            until,
+            tick,
+            limits,
+        )
+
+    ticks = min(
+        ceil((until - total_time_traveled) / HALF_MINUTE),
+        _ticks_until(
+            time_traveled_within_eight_hrs, HALF_MINUTE, limits.max_driving_within_eight_hrs
+        ) - 1,
+        _ticks_until(time_spent_in_driving, LOG_HALF_MINUTE, limits.max_driving_time) - 1,
+        _ticks_until(current_on_duty_hour, LOG_HALF_MINUTE, limits.max_on_duty_time) - 1,
+    )
+    ticks, miles_traveled = _fuel_ticks(
+        miles_traveled, miles_per_tick, limits.max_miles_before_refueling, max(0, ticks)
+    )
+    if ticks <= 0:
+        return (
+            current_hour,
+            current_on_duty_hour,
+            time_spent_in_driving,
+            total_time_traveled,
+            time_traveled_within_eight_hrs,
+            miles_traveled,
+        )
+
+    return (
+        log.drive_ticks(current_hour, ticks, LOG_HALF_MINUTE),
+        current_on_duty_hour + ticks * LOG_HALF_MINUTE,
+        time_spent_in_driving + ticks * LOG_HALF_MINUTE,
+        total_time_traveled + ticks * HALF_MINUTE,
+        time_traveled_within_eight_hrs + ticks * HALF_MINUTE,
+        miles_traveled,
+    )
+
+
+def _cruise_minutes(
+    log,
+    current_hour,
+    current_on_duty_hour,
+    time_spent_in_driving,
+    total_time_traveled,
+    time_traveled_within_eight_hrs,
+    miles_traveled,
+    miles_per_tick,
+    until,
+    tick,
+    limits,
+):
+    # `cruise()` for ticks under 30 minutes: the hour limits are compared in
+    # whole minutes, and the miles to the refueling threshold in closed form
+    # rather than through `_fuel_ticks()`, whose loop grows with the tick count.
+    if miles_per_tick > 0:
+        refuel_ticks = _ticks_until(
+            miles_traveled, miles_per_tick, limits.max_miles_before_refueling
+        )
+    else:
+        refuel_ticks = float("inf")
+    ticks = min(
+        ceil((until - total_time_traveled) / tick),
+        _ticks_until(time_traveled_within_eight_hrs, tick, limits.max_driving_within_eight_hrs) - 1,
+        _ticks_until(round(time_spent_in_driving * 60), tick, limits.max_driving_minutes) - 1,
+        _ticks_until(round(current_on_duty_hour * 60), tick, limits.max_on_duty_minutes) - 1,
+        refuel_ticks - 1,
+    )
+    if ticks <= 0:
+        return (
+            current_hour,
+            current_on_duty_hour,
+            time_spent_in_driving,
+            total_time_traveled,
+            time_traveled_within_eight_hrs,
+            miles_traveled,
+        )
+
+    current_hour = _advance(current_hour, ticks, tick)
+    log.extend_driving(current_hour)
+    return (
+        current_hour,
+        _advance(current_on_duty_hour, ticks, tick),
+        _advance(time_spent_in_driving, ticks, tick),
+        total_time_traveled + ticks * tick,
+        time_traveled_within_eight_hrs + ticks * tick,
+        miles_traveled + ticks * miles_per_tick,
+    )
@@ -0,0 +1,503 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from .autofill_logbook import RESOLUTIONS, auto_fill_logbook, day_memo, fill_logbook_days
+from .cache import logbook_cache
+from .logbook import ACTION_CODES, encode_days, materialize
+from .models import LogEntry
+from .rules import default_profile, rule_profiles
+from .summary import summarize_days, summary_memo
+from .sweep import read_sweep, run_sweep
+from .trips import (
+    InvalidTrip,
+    Trip,
+    clear_day_starts,
+    parse_trip,
+    plan_day,
+    plan_distinct,
+    plan_trip,
+    simulate,
+    trip_key,
+)
+
+# pickup_time, total_driving_time (minutes), total_distance_miles
+SAMPLE_TRIPS = {
+    "day-trip": (120, 480, 420),
+    "cross-country": (600, 2700, 2800),
+    "multi-week": (600, 20160, 21000),
+}
+
+# Ranges of total driving time (minutes), average speed (mph) and where the
+# pickup falls as a fraction of the trip, for each synthetic trip profile.
+PROFILES = {
+    "short": {"driving_time": (60, 600), "speed": (40, 60), "pickup": (0.1, 0.5)},
+    "pickup-heavy": {"driving_time": (600, 3000), "speed": (45, 60), "pickup": (0.8, 1.2)},
+    "fuel-heavy": {"driving_time": (1500, 3600), "speed": (65, 75), "pickup": (0.1, 0.3)},
+    "multi-week": {"driving_time": (10080, 30240), "speed": (50, 60), "pickup": (0.05, 0.2)},
+}
+
+# Trips that do not fit in a 70-hour cycle are rejected by generate_logbook,
+# so only these profiles are timed through the request path.
+REQUEST_PROFILES = ("short", "pickup-heavy", "fuel-heavy")
+
+
+def synthetic_trips(profile, count, seed=0):
+    """Returns `count` generate_logbook payloads drawn from one of PROFILES."""
+    ranges = PROFILES[profile]
+    rng = random.Random(f"{profile}:{seed}")
+    trips = []
+    for _ in range(count):
+        total_driving_time = rng.randint(*ranges["driving_time"])
+        trips.append(
+            {
+                "current_cycle_hour": 0,
+                "total_driving_time": total_driving_time,
+                "pickup_time": max(1, int(total_driving_time * rng.uniform(*ranges["pickup"]))),
+                "total_distance_miles": max(
+                    1, total_driving_time * rng.randint(*ranges["speed"]) // 60
+                ),
+            }
+        )
+    return trips
+
+
+def _traced(build):
+    """Runs `build()` and returns its result with the retained and peak bytes it allocated."""
+    tracemalloc.start()
+    try:
+        result = build()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def _reset_caches():
+    logbook_cache.clear()
+    day_memo.clear()
+    summary_memo.clear()
+
+
+def measure_engine(trips):
+    """Wall time, peak allocations and entries per second of the engine on its own."""
+    _reset_caches()
+    start = time.perf_counter()
+    entries = 0
+    for trip in trips:
+        days = fill_logbook_days(
+            trip["pickup_time"], trip["total_driving_time"], trip["total_distance_miles"]
+        )
+        entries += sum(len(day) for day in days)
+    seconds = time.perf_counter() - start
+
+    _reset_caches()
+    _, _, peak = _traced(
+        lambda: [
+            fill_logbook_days(
+                trip["pickup_time"], trip["total_driving_time"], trip["total_distance_miles"]
+            )
+            for trip in trips
+        ]
+    )
+    return _timings(len(trips), seconds, entries, peak)
+
+
+def measure_requests(client, trips, path="/api/logs/generate_logbook/"):
+    """Same as `measure_engine()`, but through the full DRF request path."""
+    def post_all():
+        for trip in trips:
+            response = client.post(path, json.dumps(trip), content_type="application/json")
+            assert response.status_code == 200, response.content
+
+    _reset_caches()
+    start = time.perf_counter()
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        post_all()
+    seconds = time.perf_counter() - start
+
+    entries = sum(
+        len(day)
+        for trip in trips
+        for day in fill_logbook_days(
+            trip["pickup_time"], trip["total_driving_time"], trip["total_distance_miles"]
+        )
+    )
+    _reset_caches()
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        _, _, peak = _traced(post_all)
+    return _timings(len(trips), seconds, entries, peak)
+
+
+def _timings(trips, seconds, entries, peak):
+    return {
+        "trips": trips,
+        "seconds": seconds,
+        "seconds_per_trip": seconds / trips,
+        "entries": entries,
+        "entries_per_second": entries / seconds,
+        "peak_bytes": peak,
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Lists the timings in `results` that are more than `threshold` (a fraction)
+    slower per trip than the same timing in `baseline`.
+    """
+    regressions = []
+    for section in ("engine", "requests"):
+        for profile, timing in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(profile)
+            if not previous:
+                continue
+            limit = previous["seconds_per_trip"] * (1 + threshold)
+            if timing["seconds_per_trip"] > limit:
+                regressions.append(
+                    f"{section}/{profile}: {timing['seconds_per_trip'] * 1e3:.3f} ms/trip, "
+                    f"baseline {previous['seconds_per_trip'] * 1e3:.3f} ms/trip"
+                )
+    return regressions
+
+
+def measure_resolutions(trips):
+    """
+    Engine time and entries for `trips` at each of RESOLUTIONS, and the
+    slowdown against 30-minute ticks.
+    """
+    results = {}
+    for minutes in sorted(RESOLUTIONS, reverse=True):
+        _reset_caches()
+        start = time.perf_counter()
+        entries = 0
+        for trip in trips:
+            days = fill_logbook_days(
+                trip["pickup_time"],
+                trip["total_driving_time"],
+                trip["total_distance_miles"],
+                resolution_minutes=minutes,
+            )
+            entries += sum(len(day) for day in days)
+        results[minutes] = {"seconds": time.perf_counter() - start, "entries": entries}
+    for result in results.values():
+        result["slowdown"] = result["seconds"] / results[30]["seconds"]
+    return results
+
+
+def measure_profiles(trips):
+    """
+    Engine time and days for `trips` under each rule profile, and the time
+    against the default profile.
+    """
+    results = {}
+    for name, rules in rule_profiles.items():
+        _reset_caches()
+        start = time.perf_counter()
+        days = 0
+        for trip in trips:
+            days += len(
+                fill_logbook_days(
+                    trip["pickup_time"],
+                    trip["total_driving_time"],
+                    trip["total_distance_miles"],
+                    limits=rules.limits,
+                )
+            )
+        results[name] = {"seconds": time.perf_counter() - start, "days": days}
+    for result in results.values():
+        result["relative"] = result["seconds"] / results[default_profile.name]["seconds"]
+    return results
+
+
+def measure_memory(pickup_time, total_driving_time, total_distance_miles):
+    """Compares the memory held by the dict-per-entry logbook and the compact LogDay one."""
+    _reset_caches()
+    days, compact_bytes, compact_peak = _traced(
+        lambda: fill_logbook_days(pickup_time, total_driving_time, total_distance_miles)
+    )
+    _reset_caches()
+    _, dict_bytes, dict_peak = _traced(
+        lambda: auto_fill_logbook(pickup_time, total_driving_time, total_distance_miles)
+    )
+    return {
+        "days": len(days),
+        "entries": sum(len(day) for day in days),
+        "dict_bytes": dict_bytes,
+        "dict_peak": dict_peak,
+        "compact_bytes": compact_bytes,
+        "compact_peak": compact_peak,
+    }
+
+
+def _best_of(repeat, render):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - start)
+    return min(timings), body
+
+
+def measure_rendering(pickup_time, total_driving_time, total_distance_miles, repeat=5):
+    """
+    Time to turn a plan into the response body with the generic JSONRenderer
+    (materialize, then encode) and with the pre-encoded `encode_days()`.
+    """
+    days = fill_logbook_days(pickup_time, total_driving_time, total_distance_miles)
+    renderer = JSONRenderer()
+    generic, expected = _best_of(repeat, lambda: renderer.render(materialize(days)))
+    encoded, body = _best_of(repeat, lambda: encode_days(days))
+    assert body == expected, "encode_days() output differs from JSONRenderer"
+    return {"bytes": len(body), "generic_seconds": generic, "encoded_seconds": encoded}
+
+
+def measure_sweep(trip, start_offsets=(0, 9.5, 0.5), speeds=(40, 89, 1)):
+    """
+    Time to sweep `trip` (pickup_time, total_driving_time, total_distance_miles)
+    over a grid of departure hours and speeds, 1,000 points by default.
+    """
+    pickup_time, total_driving_time, total_distance_miles = trip
+    options = read_sweep(
+        {
+            "trip": {
+                "pickup_time": pickup_time,
+                "total_driving_time": total_driving_time,
+                "total_distance_miles": total_distance_miles,
+            },
+            "start_offsets": dict(zip(("start", "stop", "step"), start_offsets)),
+            "speeds": dict(zip(("start", "stop", "step"), speeds)),
+        }
+    )
+    start = time.perf_counter()
+    result = run_sweep(options)
+    return {
+        "points": len(options.start_offsets) * len(options.speeds),
+        "seconds": time.perf_counter() - start,
+        "pruned": result["pruned"],
+        "pareto": len(result["pareto"]),
+    }
+
+
+def _full_summary(days):
+    refueling = ACTION_CODES["Refueling"]
+    drop_off = ACTION_CODES["Drop-off"]
+    last = days[-1]
+    return [
+        (
+            day.total_time_traveled,
+            day.time_spent_in_off_duty,
+            day.time_spent_in_on_duty,
+            day.time_spent_in_driving,
+            day.time_spent_in_sleeper_berth,
+            day.actions.count(refueling),
+        )
+        for day in days
+    ], last.hours[len(last.actions) - 1 - last.actions[::-1].index(drop_off)]
+
+
+def _summary(days):
+    return [
+        (
+            day.total_time_traveled,
+            day.time_spent_in_off_duty,
+            day.time_spent_in_on_duty,
+            day.time_spent_in_driving,
+            day.time_spent_in_sleeper_berth,
+            day.fueling_stops,
+        )
+        for day in days
+    ], days[-1].finish_hour
+
+
+def measure_summary(trips):
+    """
+    Checks the summary mode against the full engine on `trips`. Every day's
+    totals and fuel stops, and the finish hour, must match; the trips that do
+    not are listed under "mismatches".
+
+    The summary mode still simulates every day, so it is not timed: what it
+    saves is the logbook points in the response, not planning time.
+    """
+    _reset_caches()
+    mismatches = []
+    for trip in trips:
+        args = (trip["pickup_time"], trip["total_driving_time"], trip["total_distance_miles"])
+        if _full_summary(fill_logbook_days(*args)) != _summary(summarize_days(*args)):
+            mismatches.append(trip)
+    return {
+        "trips": len(trips),
+        "mismatches": mismatches,
+    }
+
+
+def measure_day_access(trip, days=(0, 24), repeat=5):
+    """
+    Time to plan single days of `trip` (pickup_time, total_driving_time,
+    total_distance_miles) with `plan_day()`, against simulating the whole
+    plan. "cold" timings include finding the day starts of the plan.
+    """
+    pickup_time, total_driving_time, total_distance_miles = trip
+    trip = Trip(0, total_driving_time, pickup_time, total_distance_miles)
+
+    def timed(build, cold=True):
+        timings = []
+        for _ in range(repeat):
+            _reset_caches()
+            if cold:
+                clear_day_starts()
+            start = time.perf_counter()
+            build()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    result = {"full_seconds": timed(lambda: simulate(trip))}
+    for day in days:
+        result[f"day_{day}_cold_seconds"] = timed(lambda: plan_day(trip, day))
+        result[f"day_{day}_seconds"] = timed(lambda: plan_day(trip, day), cold=False)
+    return result
+
+
+def dispatch_batch(size, distinct_loads=200, seed=0):
+    """A nightly dispatch batch: `size` payloads drawn from `distinct_loads` lanes."""
+    rng = random.Random(seed)
+    lanes = []
+    for _ in range(distinct_loads):
+        total_driving_time = rng.randint(60, 3000)
+        lanes.append(
+            {
+                "current_cycle_hour": rng.randint(0, 20),
+                "total_driving_time": total_driving_time,
+                "pickup_time": rng.randint(30, total_driving_time),
+                "total_distance_miles": total_driving_time * rng.randint(40, 65) // 60 or 1,
+            }
+        )
+    return [rng.choice(lanes) for _ in range(size)]
+
+
+def measure_batch(payloads):
+    """
+    How many plans `plan_distinct()` simulates for `payloads`: one per
+    distinct plan key, against one per valid payload when planned one at a
+    time. The plans themselves take as long either way, so no rate is given.
+    """
+    keys = []
+    for data in payloads:
+        try:
+            keys.append(trip_key(parse_trip(data)))
+        except InvalidTrip:
+            pass
+
+    _reset_caches()
+    results = plan_distinct(payloads)
+    return {
+        "trips": len(payloads),
+        "planned": len(keys),
+        "simulated": len(set(keys)),
+        "errors": sum("error" in result for result in results),
+    }
+
+
+def mixed_traffic(count, long_share=0.2, seed=0):
+    """Short trips with a share of the longest trips that still pass the cycle check."""
+    rng = random.Random(seed)
+    short = synthetic_trips("short", count, seed)
+    long = synthetic_trips("fuel-heavy", count, seed)
+    return [long[i] if rng.random() < long_share else short[i] for i in range(count)]
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure_load(client, trips, path, concurrency=16):
+    """
+    Sends `trips` to `path` through an AsyncClient, `concurrency` at a time,
+    and returns the latency percentiles in seconds.
+    """
+    async def send(trip, slots, latencies):
+        async with slots:
+            start = time.perf_counter()
+            response = await client.post(
+                path, json.dumps(trip), content_type="application/json"
+            )
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        latencies = []
+        await asyncio.gather(*(send(trip, slots, latencies) for trip in trips))
+        return latencies
+
+    _reset_caches()
+    start = time.perf_counter()
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        latencies = asyncio.run(run())
+    return {
+        "requests": len(trips),
+        "seconds": time.perf_counter() - start,
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+    }
+
+
+def historical_rows(count, seed=0):
+    """`count` LogEntry rows as an import of historical trips would contain."""
+    rng = random.Random(seed)
+    return [
+        {
+            "current_cycle_hour": rng.randint(0, 70),
+            "total_driving_time": rng.randint(60, 3000),
+            "pickup_time": rng.randint(30, 1500),
+            "total_distance_miles": rng.randint(50, 3000),
+        }
+        for _ in range(count)
+    ]
+
+
+def _as_csv(rows):
+    lines = [",".join(rows[0])]
+    lines.extend(",".join(str(value) for value in row.values()) for row in rows)
+    return "\n".join(lines) + "\n"
+
+
+def measure_ingest(client, rows, single_rows=200):
+    """
+    Rows per second imported through the bulk endpoint, as JSON and as CSV,
+    and through one POST per row for the first `single_rows` rows.
+
+    The rows are deleted after each run; call it on a test database, as
+    benchmark_logbook does.
+    """
+    def rate(post, count):
+        start = time.perf_counter()
+        post()
+        seconds = time.perf_counter() - start
+        LogEntry.objects.all().delete()
+        return count / seconds
+
+    def post_bulk(body, content_type):
+        response = client.post("/api/logs/bulk/", body, content_type=content_type)
+        assert response.status_code == 201, response.content
+
+    def post_each():
+        for row in rows[:single_rows]:
+            response = client.post("/api/logs/", json.dumps(row), content_type="application/json")
+            assert response.status_code == 201, response.content
+
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        return {
+            "rows": len(rows),
+            "json_rows_per_second": rate(
+                lambda: post_bulk(json.dumps(rows), "application/json"), len(rows)
+            ),
+            "csv_rows_per_second": rate(lambda: post_bulk(_as_csv(rows), "text/csv"), len(rows)),
+            "single_rows_per_second": rate(post_each, min(single_rows, len(rows))),
+        }
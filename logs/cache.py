@@ -0,0 +1,193 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .autofill_logbook import ENGINE_VERSION
+
+DEFAULTS = {
+    "MAX_ENTRIES": 512,
+    "MAX_BYTES": 32 * 1024 * 1024,
+    "BACKEND": None,  # Alias of a Django cache to use as a shared second tier.
+    "TIMEOUT": 24 * 60 * 60,
+}
+
+# Rough cost of a LogDay beyond its column buffers (object, arrays, totals).
+DAY_OVERHEAD_BYTES = 400
+
+
+def plan_key(
+    pickup_time,
+    total_driving_time,
+    total_distance_miles,
+    stops=(),
+    resolution_minutes=30,
+    limits_key="",
+):
+    """
+    Cache key for a plan, from the engine inputs normalised to whole minutes and miles.
+
+    ENGINE_VERSION is part of the key, so bumping it invalidates every tier.
+    Multi-stop trips add each stop's arrival, dwell and action, plans at
+    another resolution than 30 minutes their tick length, and plans under
+    other limits than the default ones the key of their Limits table.
+    """
+    key = (
+        f"logbook:v{ENGINE_VERSION}:"
+        f"{int(pickup_time)}:{int(total_driving_time)}:{int(total_distance_miles)}"
+    )
+    if stops:
+        key += ":" + ";".join(f"{arrival},{dwell},{action}" for arrival, dwell, action in stops)
+    if resolution_minutes != 30:
+        key += f":r{resolution_minutes}"
+    if limits_key:
+        key += f":h{limits_key}"
+    return key
+
+
+def plan_hash(
+    pickup_time,
+    total_driving_time,
+    total_distance_miles,
+    stops=(),
+    resolution_minutes=30,
+    limits_key="",
+):
+    """Content address of a plan: the SHA-256 of its `plan_key()`, in hex."""
+    key = plan_key(
+        pickup_time,
+        total_driving_time,
+        total_distance_miles,
+        stops,
+        resolution_minutes,
+        limits_key,
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def plan_size(days):
+    """Approximate memory held by a list of LogDay objects."""
+    return sum(
+        DAY_OVERHEAD_BYTES
+        + day.hours.itemsize * len(day.hours)
+        + day.rows.itemsize * len(day.rows)
+        + day.actions.itemsize * len(day.actions)
+        for day in days
+    )
+
+
+class LogbookCache:
+    """
+    Two-tier cache of generated plans.
+
+    The first tier is an in-process LRU bounded by entry count and by the
+    approximate size of the cached days. The optional second tier is a Django
+    cache backend shared between processes. Plans are stored as tuples of
+    LogDay objects and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries, max_bytes, backend=None, timeout=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.timeout = timeout
+        self._plans = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, "LOGBOOK_CACHE", {})}
+        backend = caches[options["BACKEND"]] if options["BACKEND"] else None
+        return cls(
+            options["MAX_ENTRIES"],
+            options["MAX_BYTES"],
+            backend=backend,
+            timeout=options["TIMEOUT"],
+        )
+
+    def get(self, key):
+        days = self.get_local(key)
+        if days is not None:
+            return days
+
+        if self.backend is not None:
+            days = self.backend.get(key)
+            if days is not None:
+                with self._lock:
+                    self.backend_hits += 1
+                self._remember(key, days)
+                return days
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_local(self, key):
+        """The plan for `key` from the in-process tier alone, or None; never waits on the backend."""
+        with self._lock:
+            days = self._plans.get(key)
+            if days is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+            return days
+
+    def set(self, key, days):
+        days = tuple(days)
+        self._remember(key, days)
+        if self.backend is not None:
+            self.backend.set(key, days, self.timeout)
+        return days
+
+    def get_or_build(self, key, build):
+        """Returns the cached plan for `key`, calling `build()` and caching it on a miss."""
+        days = self.get(key)
+        if days is None:
+            days = self.set(key, build())
+        return days
+
+    def _remember(self, key, days):
+        size = plan_size(days)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._plans:
+                self._bytes -= self._sizes[key]
+            self._plans[key] = days
+            self._plans.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            while len(self._plans) > self.max_entries or self._bytes > self.max_bytes:
+                evicted, _ = self._plans.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.backend_hits + self.misses
+            return {
+                "version": ENGINE_VERSION,
+                "entries": len(self._plans),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.backend_hits) / lookups if lookups else 0.0,
+            }
+
+
+logbook_cache = LogbookCache.from_settings()
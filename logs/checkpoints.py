@@ -0,0 +1,163 @@
+from collections import namedtuple
+
+from django.core import signing
+
+from .autofill_logbook import ENGINE_VERSION, HALF_MINUTE, Stop, iter_logbook_days
+from .rules import LEGACY_PROFILE, default_profile
+from .trips import MAX_TOTAL_DRIVING_TIME, InvalidTrip, read_rule_profile, read_stops
+
+SALT = "logs.checkpoint"
+
+# Longest remaining trip a replan accepts, in minutes of driving. A replan
+# has no cycle check, so this is what bounds the simulation.
+MAX_REMAINING_DRIVING_TIME = MAX_TOTAL_DRIVING_TIME
+
+Replan = namedtuple(
+    "Replan",
+    [
+        "day",
+        "total_driving_time",
+        "total_distance_miles",
+        "carry_over",
+        "stops",
+        "resolution_minutes",
+        "rules",
+    ],
+)
+
+
+def export(
+    checkpoints,
+    total_driving_time,
+    total_distance_miles,
+    first_day=0,
+    resolution_minutes=HALF_MINUTE,
+    rules=default_profile,
+):
+    """
+    Turns the checkpoints collected by `iter_logbook_days()` into the list
+    served with a plan: the carry-over each day starts from, and a signed
+    token that `read_replan()` accepts to plan the rest of the trip. The
+    token names the rule profile, `rules`, the plan was made under.
+    """
+    exported = []
+    for offset, checkpoint in enumerate(checkpoints):
+        day = first_day + offset
+        token = signing.dumps(
+            {
+                "version": ENGINE_VERSION,
+                "day": day,
+                "total_driving_time": total_driving_time,
+                "total_distance_miles": total_distance_miles,
+                "resolution_minutes": resolution_minutes,
+                "rule_profile": rules.name,
+                **checkpoint,
+            },
+            salt=SALT,
+            compress=True,
+        )
+        exported.append({"day": day, "state": checkpoint, "token": token})
+    return exported
+
+
+def _positive_int(data, name):
+    value = data.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidTrip(f"{name} must be a number.")
+    if not 0 < value <= MAX_REMAINING_DRIVING_TIME:
+        raise InvalidTrip(f"{name} must be between 1 and {MAX_REMAINING_DRIVING_TIME}.")
+    return value
+
+
+def read_replan(data):
+    """
+    Validates a replan payload and returns it as a Replan.
+
+    The payload holds the `checkpoint` token (or the checkpoint object it came
+    in) and optionally what changed since: `remaining_driving_time` and
+    `remaining_distance_miles` to the drop-off, and the `stops` still to make,
+    with arrivals counted in minutes of driving from the checkpoint. Without
+    changes the plan continues exactly as the original one.
+    """
+    if not isinstance(data, dict):
+        raise InvalidTrip("Expected a JSON object.")
+    token = data.get("checkpoint")
+    if isinstance(token, dict):
+        token = token.get("token")
+    try:
+        checkpoint = signing.loads(str(token), salt=SALT)
+    except signing.BadSignature:
+        raise InvalidTrip("Invalid checkpoint.")
+    if checkpoint["version"] != ENGINE_VERSION:
+        raise InvalidTrip(
+            "The checkpoint was made by another engine version; plan the trip again."
+        )
+
+    traveled = checkpoint["previous_total_time_traveled"]
+    resolution_minutes = checkpoint.get("resolution_minutes", HALF_MINUTE)
+    # Tokens without a profile were made under the historical limits.
+    rules = read_rule_profile(checkpoint.get("rule_profile", LEGACY_PROFILE))
+    total_driving_time = checkpoint["total_driving_time"]
+    total_distance_miles = checkpoint["total_distance_miles"]
+
+    remaining_time = _positive_int(data, "remaining_driving_time")
+    remaining_distance = _positive_int(data, "remaining_distance_miles")
+    if remaining_time is not None or remaining_distance is not None:
+        # The engine drives at total distance / total time, so the new totals
+        # are those that give the remaining leg's speed.
+        if remaining_time is None:
+            remaining_time = max(1, total_driving_time - traveled)
+        if remaining_distance is None:
+            remaining_distance = total_distance_miles / total_driving_time * remaining_time
+        new_total = traveled + remaining_time
+        total_distance_miles = remaining_distance / remaining_time * new_total
+        total_driving_time = new_total
+
+    if "stops" in data:
+        stops = tuple(
+            stop._replace(arrival=traveled + stop.arrival)
+            for stop in (
+                read_stops(data["stops"], resolution_minutes) if data["stops"] else ()
+            )
+        )
+    else:
+        stops = tuple(Stop(*stop) for stop in checkpoint["stops"])
+    if stops and stops[-1].arrival > total_driving_time:
+        raise InvalidTrip("Stops must be reached within the remaining driving time.")
+
+    carry_over = {
+        name: checkpoint[name]
+        for name in (
+            "previous_total_time_traveled",
+            "prev_sleeper_berth_hr",
+            "miles_traveled",
+            "continue_driving",
+        )
+    }
+    return Replan(
+        checkpoint["day"],
+        total_driving_time,
+        total_distance_miles,
+        carry_over,
+        stops,
+        resolution_minutes,
+        rules,
+    )
+
+
+def iter_replan_days(replan, checkpoints=None):
+    """Simulates the rest of a trip from a Replan's checkpoint."""
+    return iter_logbook_days(
+        duration_from_current_location_to_pickup=None,
+        total_time_minutes=replan.total_driving_time,
+        total_distance_miles=replan.total_distance_miles,
+        stops=replan.stops,
+        checkpoints=checkpoints,
+        resolution_minutes=replan.resolution_minutes,
+        limits=replan.rules.limits,
+        **replan.carry_over,
+    )
@@ -0,0 +1,150 @@
+"""
+Columnar wire format for logbooks.
+
+Served by generate_logbook for `Accept: application/vnd.logbook.columnar+json`.
+The document is JSON, with the day entries sent as columns instead of one
+object per entry::
+
+    {
+      "format": "logbook-columnar",
+      "version": 1,
+      "hourUnitMinutes": 30,
+      "rows": ["off-duty", "sleeper", "driving", "on-duty"],
+      "actions": [null, "Pre-trip/TIV", "30-minute break", ...],
+      "totals": ["totalTimeTraveled", "timeSpentInOffDuty", ...],
+      "days": [
+        {
+          "hours": [0, 12, 1, 0, 1, ...],
+          "rows": [0, 3, 2, 2, 2, ...],
+          "actions": [[1, 1], [6, 3], ...],
+          "totals": [0, 8.5, 2.0, 13.5, 0]
+        }
+      ]
+    }
+
+For each day:
+
+- `hours` are in units of `hourUnitMinutes`, the coarsest of the engine's
+  resolutions (30, 15, 5 or 1 minutes) every hour of the document falls on.
+  The first value is the hour of the first entry, every other value the
+  difference to the previous entry.
+- `rows` holds, for each entry, an index into the top-level `rows`.
+- `actions` lists `[entry index, index into the top-level actions]` for the
+  entries that have an "action" key; the others have none.
+- `totals` holds the day's values named by the top-level `totals`.
+
+`decode()` below is the reference decoder: it returns exactly the list of
+days of the default JSON response. The same in JavaScript, for clients::
+
+    function decodeLogbook(doc) {
+      if (doc.format !== "logbook-columnar" || doc.version !== 1) {
+        throw new Error("Not a version 1 columnar logbook.");
+      }
+      return doc.days.map((day) => {
+        const actions = new Map(day.actions);
+        let units = 0;
+        const logbook = day.hours.map((delta, index) => {
+          units += delta;
+          const entry = {
+            hour: (units * doc.hourUnitMinutes) / 60,
+            row: doc.rows[day.rows[index]],
+          };
+          if (actions.has(index)) entry.action = doc.actions[actions.get(index)];
+          return entry;
+        });
+        const result = { logbook, currentHour: 0 };
+        doc.totals.forEach((name, index) => { result[name] = day.totals[index]; });
+        return result;
+      });
+    }
+
+Only plans are sent in this format. Other bodies, such as errors or a plan
+with its checkpoints, are plain JSON and are sent as `application/json`.
+"""
+
+from .autofill_logbook import RESOLUTIONS
+from .logbook import ACTIONS, NO_ACTION, ROWS
+
+MEDIA_TYPE = "application/vnd.logbook.columnar+json"
+FORMAT = "logbook-columnar"
+VERSION = 1
+HOUR_UNIT_MINUTES = 30
+
+TOTALS = (
+    "totalTimeTraveled",
+    "timeSpentInOffDuty",
+    "timeSpentInOnDuty",
+    "timeSpentInDriving",
+    "timeSpentInSleeperBerth",
+)
+
+
+def hour_unit(days):
+    """The coarsest resolution, in minutes, that every hour of `days` falls on."""
+    for minutes in sorted(RESOLUTIONS, reverse=True):
+        units_per_hour = 60 / minutes
+        if all(
+            abs(hour * units_per_hour - round(hour * units_per_hour)) < 1e-6
+            for day in days
+            for hour in day.hours
+        ):
+            return minutes
+    return min(RESOLUTIONS)
+
+
+def encode_day(day, hour_unit_minutes=HOUR_UNIT_MINUTES):
+    units_per_hour = 60 / hour_unit_minutes
+    units = [round(hour * units_per_hour) for hour in day.hours]
+    actions = [
+        [index, code - 1] for index, code in enumerate(day.actions) if code != NO_ACTION
+    ]
+    return {
+        "hours": units[:1] + [b - a for a, b in zip(units, units[1:])],
+        "rows": list(day.rows),
+        "actions": actions,
+        "totals": [
+            day.total_time_traveled,
+            day.time_spent_in_off_duty,
+            day.time_spent_in_on_duty,
+            day.time_spent_in_driving,
+            day.time_spent_in_sleeper_berth,
+        ],
+    }
+
+
+def encode(days):
+    """The columnar document for a list of LogDay objects."""
+    minutes = hour_unit(days)
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "hourUnitMinutes": minutes,
+        "rows": list(ROWS),
+        "actions": ACTIONS[1:],
+        "totals": list(TOTALS),
+        "days": [encode_day(day, minutes) for day in days],
+    }
+
+
+def decode(document):
+    """Turns a columnar document back into the default list-of-days JSON shape."""
+    if document.get("format") != FORMAT or document.get("version") != VERSION:
+        raise ValueError("Not a version 1 columnar logbook.")
+    rows = document["rows"]
+    actions = document["actions"]
+    minutes = document["hourUnitMinutes"]
+    logbooks = []
+    for day in document["days"]:
+        sparse_actions = dict(day["actions"])
+        entries = []
+        units = 0
+        for index, (delta, row) in enumerate(zip(day["hours"], day["rows"])):
+            units += delta
+            entry = {"hour": units * minutes / 60, "row": rows[row]}
+            if index in sparse_actions:
+                entry["action"] = actions[sparse_actions[index]]
+            entries.append(entry)
+        logbook = {"logbook": entries, "currentHour": 0}
+        logbook.update(zip(document["totals"], day["totals"]))
+        logbooks.append(logbook)
+    return logbooks
@@ -0,0 +1,162 @@
+import codecs
+import csv
+import json
+
+from django.db import transaction
+
+from .models import LogEntry
+
+FIELDS = ("current_cycle_hour", "total_driving_time", "pickup_time", "total_distance_miles")
+
+# Upper bounds of the integer columns (PositiveSmallIntegerField for the cycle hour).
+MAX_VALUES = {"current_cycle_hour": 32767}
+MAX_VALUE = 2147483647
+
+CHUNK_ROWS = 2000  # Rows validated and inserted per transaction.
+READ_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+
+class IngestError(Exception):
+    """Raised when the body cannot be read at all; the message is returned to the client."""
+
+
+def iter_json_rows(stream):
+    """
+    Yields the items of a JSON array read from a binary `stream`, without
+    loading the whole body.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    offset = 0  # Bytes read before `chunk`.
+    started = False
+    finished = False
+    eof = False
+    while not finished:
+        if not eof:
+            chunk = stream.read(READ_SIZE)
+            eof = not chunk
+            # The decoder holds back the bytes of a character split across chunks.
+            pending = len(text.getstate()[0])
+            try:
+                buffer = buffer[position:] + text.decode(chunk, final=eof)
+            except UnicodeDecodeError as error:
+                raise IngestError(
+                    f"The JSON body is not valid UTF-8 at byte {offset - pending + error.start}."
+                )
+            offset += len(chunk)
+            position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise IngestError("Expected a JSON array of log entries.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise IngestError("The JSON body is malformed or truncated.")
+                break
+            yield item
+        if eof and not finished:
+            raise IngestError("The JSON body is malformed or truncated.")
+
+
+def _decoded_lines(stream):
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    number = 0
+    for number, line in enumerate(iter(stream.readline, b""), 1):
+        try:
+            yield text.decode(line)
+        except UnicodeDecodeError:
+            raise IngestError(f"Line {number} of the CSV body is not valid UTF-8.")
+    try:
+        text.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise IngestError(f"Line {number} of the CSV body is not valid UTF-8.")
+
+
+def iter_csv_rows(stream):
+    """Yields a dict per line of a CSV file with a header row, read from a binary `stream`."""
+    reader = csv.DictReader(_decoded_lines(stream))
+    try:
+        if reader.fieldnames is None:
+            return
+        missing = set(FIELDS) - set(reader.fieldnames)
+        if missing:
+            raise IngestError(f"Missing CSV columns: {', '.join(sorted(missing))}.")
+        yield from reader
+    except csv.Error as error:
+        # DictReader only copies line_num once a row is read.
+        line = reader.reader.line_num
+        raise IngestError(f"Line {line} of the CSV body is malformed: {error}.")
+
+
+def _entry(item):
+    """Validates one row and returns an unsaved LogEntry, or raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Expected an object.")
+    values = {}
+    for field in FIELDS:
+        value = item.get(field)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field}: expected an integer.")
+        if not 0 <= value <= MAX_VALUES.get(field, MAX_VALUE):
+            raise ValueError(f"{field}: out of range.")
+        values[field] = value
+    return LogEntry(**values)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest(rows, chunk_size=CHUNK_ROWS):
+    """
+    Validates and inserts `rows` (dicts of the LogEntry fields) chunk by chunk.
+
+    Each chunk is inserted with one bulk_create in its own transaction, so a
+    failure only loses the chunk being written. Invalid rows are skipped and
+    reported with their position in the input. If the body itself turns out
+    to be unreadable, the chunks before that point stay inserted and the
+    result carries an "error".
+    """
+    result = {"created": 0, "rejected": 0, "errors": []}
+    index = 0
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            entries = []
+            for item in chunk:
+                try:
+                    entries.append(_entry(item))
+                except ValueError as error:
+                    result["rejected"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"row": index, "error": str(error)})
+                index += 1
+            with transaction.atomic():
+                LogEntry.objects.bulk_create(entries, batch_size=chunk_size)
+            result["created"] += len(entries)
+    except IngestError as error:
+        result["error"] = str(error)
+    return result
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .autofill_logbook import iter_logbook_days
+from .cache import logbook_cache
+from .logbook import materialize
+from .models import LogbookJob
+from .trips import InvalidTrip, parse_trip, stored_plan, trip_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "WORKERS": 2,  # Worker threads started in each web process; 0 to rely on run_logbook_worker.
+    "TTL": 24 * 60 * 60,  # Seconds finished jobs are kept.
+    "POLL_INTERVAL": 1.0,  # Seconds an idle worker waits before looking for jobs again.
+    "STALE_AFTER": 5 * 60,  # Seconds without progress after which a running job is requeued.
+    "PROGRESS_INTERVAL": 0.5,  # Minimum seconds between progress writes.
+}
+
+
+def _options():
+    return {**DEFAULTS, **getattr(settings, "LOGBOOK_JOBS", {})}
+
+
+def submit(trips, single):
+    """Queues a job for `trips` (a list of generate_logbook payloads) and wakes a worker."""
+    purge_expired()
+    job = LogbookJob.objects.create(trips=trips, single=single)
+    pool.start()
+    pool.wake()
+    return job
+
+
+def purge_expired():
+    LogbookJob.objects.filter(expires_at__lt=timezone.now()).delete()
+
+
+def requeue_stale():
+    """Puts back jobs whose worker died, e.g. because its process was restarted."""
+    cutoff = timezone.now() - timedelta(seconds=_options()["STALE_AFTER"])
+    LogbookJob.objects.filter(status=LogbookJob.RUNNING, updated_at__lt=cutoff).update(
+        status=LogbookJob.QUEUED, updated_at=timezone.now()
+    )
+
+
+def claim_next():
+    """
+    Marks the oldest queued job as running and returns it, or None.
+
+    The status update only succeeds for one worker, so several processes can
+    share the table without a broker.
+    """
+    for job_id in LogbookJob.objects.filter(status=LogbookJob.QUEUED).values_list(
+        "id", flat=True
+    )[:10]:
+        claimed = LogbookJob.objects.filter(id=job_id, status=LogbookJob.QUEUED).update(
+            status=LogbookJob.RUNNING, updated_at=timezone.now()
+        )
+        if claimed:
+            return LogbookJob.objects.get(id=job_id)
+    return None
+
+
+class _Progress:
+    """Writes the job's progress to the database, at most every PROGRESS_INTERVAL seconds."""
+
+    def __init__(self, job):
+        self.job = job
+        self.interval = _options()["PROGRESS_INTERVAL"]
+        self.trips_completed = 0
+        self.days_completed = 0
+        self.written_at = 0.0
+
+    def day_done(self):
+        self.days_completed += 1
+        self.save()
+
+    def trip_done(self):
+        self.trips_completed += 1
+        self.save(force=True)
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.written_at < self.interval:
+            return
+        self.written_at = now
+        LogbookJob.objects.filter(id=self.job.id).update(
+            trips_completed=self.trips_completed,
+            days_completed=self.days_completed,
+            updated_at=timezone.now(),
+        )
+
+
+def _plan(data, progress):
+    try:
+        trip = parse_trip(data)
+    except InvalidTrip as error:
+        return {"error": str(error), "logbooks": []}
+
+    days = stored_plan(trip)
+    if days is None:
+        days = []
+        for day in iter_logbook_days(
+            total_time_minutes=trip.total_driving_time,
+            duration_from_current_location_to_pickup=trip.pickup_time,
+            total_distance_miles=trip.total_distance_miles,
+            stops=trip.stops or None,
+            resolution_minutes=trip.resolution_minutes,
+            limits=trip.rules.limits,
+        ):
+            days.append(day)
+            progress.day_done()
+        days = logbook_cache.set(trip_key(trip), days)
+    else:
+        progress.days_completed += len(days)
+    return {"logbooks": materialize(days)}
+
+
+def run(job):
+    """Plans every trip of a claimed job and stores the result."""
+    progress = _Progress(job)
+    try:
+        results = []
+        for data in job.trips:
+            results.append(_plan(data, progress))
+            progress.trip_done()
+    except Exception as error:
+        logger.exception("Logbook job %s failed", job.id)
+        job.status = LogbookJob.FAILED
+        job.error = str(error)
+    else:
+        job.status = LogbookJob.DONE
+        job.result = results[0]["logbooks"] if job.single else results
+        if job.single and "error" in results[0]:
+            job.status = LogbookJob.FAILED
+            job.error = results[0]["error"]
+    job.trips_completed = progress.trips_completed
+    job.days_completed = progress.days_completed
+    job.expires_at = timezone.now() + timedelta(seconds=_options()["TTL"])
+    job.save()
+
+
+def work(stop=None):
+    """Runs jobs until `stop` is set; used by the worker threads and run_logbook_worker."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            requeue_stale()
+            job = claim_next()
+            if job is not None:
+                run(job)
+                continue
+        except Exception:
+            logger.exception("Logbook worker error")
+        pool.wait(_options()["POLL_INTERVAL"])
+    close_old_connections()
+
+
+class WorkerPool:
+    """Worker threads inside the web process, started on first use."""
+
+    def __init__(self):
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(_options()["WORKERS"]):
+                thread = threading.Thread(
+                    target=work, args=(self._stop,), name=f"logbook-worker-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        if self._wakeup.wait(timeout):
+            self._wakeup.clear()
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+
+
+pool = WorkerPool()
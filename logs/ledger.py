@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DriverCycle, DriverPlan
+from .rules import MAX_CYCLE_DAYS, default_profile
+from .trips import InvalidTrip, check_cycle_hours
+
+CYCLE_DAYS = MAX_CYCLE_DAYS
+
+
+def on_duty_minutes(day):
+    """Minutes a LogDay counts against the cycle: on-duty plus driving time."""
+    return round((day.time_spent_in_on_duty + day.time_spent_in_driving) * 60)
+
+
+class CycleLedger:
+    """
+    On-duty minutes of the last CYCLE_DAYS days, as a ring buffer with a running sum.
+
+    Each day has a fixed slot, `date.toordinal() % CYCLE_DAYS`, so moving the
+    window forward only clears the slots of the days that left it, and reading
+    the minutes used never scans the history.
+    """
+
+    def __init__(self, window_end, slots=None, total=0):
+        self.window_end = window_end
+        self.slots = list(slots) if slots else [0] * CYCLE_DAYS
+        self.total = total
+
+    def advance_to(self, day):
+        """Moves the window forward so that it ends on `day`; earlier days are a no-op."""
+        days = (day - self.window_end).days
+        if days <= 0:
+            return
+        if days >= CYCLE_DAYS:
+            self.slots = [0] * CYCLE_DAYS
+            self.total = 0
+        else:
+            for offset in range(1, days + 1):
+                slot = (self.window_end.toordinal() + offset) % CYCLE_DAYS
+                self.total -= self.slots[slot]
+                self.slots[slot] = 0
+        self.window_end = day
+
+    def add(self, day, minutes):
+        """Counts `minutes` of on-duty time on `day`, moving the window forward if needed."""
+        self.advance_to(day)
+        if (self.window_end - day).days >= CYCLE_DAYS:
+            return
+        self.slots[day.toordinal() % CYCLE_DAYS] += minutes
+        self.total += minutes
+
+    def start_day(self, today):
+        """
+        The day a new plan starts on: today, or the last planned day when
+        earlier plans run past today, since a driver works one plan at a time.
+        """
+        return max(today, self.window_end)
+
+    def used_minutes(self, day, cycle_days=CYCLE_DAYS):
+        """
+        Minutes used in the `cycle_days` days ending on `day`, which is not
+        before `window_end`.
+        """
+        # The oldest slots hold the days that are no longer in that window.
+        expired = (day - self.window_end).days + CYCLE_DAYS - cycle_days
+        if expired >= CYCLE_DAYS:
+            return 0
+        return self.total - sum(
+            self.slots[(self.window_end.toordinal() + offset) % CYCLE_DAYS]
+            for offset in range(1, expired + 1)
+        )
+
+    def remaining_minutes(self, today, rules=default_profile):
+        """Minutes left in the cycle of `rules` for a plan starting on `start_day(today)`."""
+        used = self.used_minutes(self.start_day(today), rules.cycle_days)
+        return max(0, rules.cycle_hours * 60 - used)
+
+
+def _ledger(record):
+    return CycleLedger(record.window_end, record.slots, record.total)
+
+
+def driver_ledger(driver_id, today=None, current_cycle_hour=0):
+    """
+    The ledger of `driver_id`, or a new one for a driver seen for the first time.
+
+    A new ledger starts with `current_cycle_hour` hours counted on the day
+    before `today`, as reported by the client.
+    """
+    today = today or timezone.localdate()
+    record = DriverCycle.objects.filter(driver_id=driver_id).first()
+    if record is not None:
+        return _ledger(record)
+    ledger = CycleLedger(today - timedelta(days=1))
+    ledger.add(today - timedelta(days=1), current_cycle_hour * 60)
+    return ledger
+
+
+def read_driver_id(data):
+    """The optional `driver_id` of a generate_logbook payload, or None."""
+    driver_id = data.get("driver_id") if isinstance(data, dict) else None
+    if driver_id in (None, ""):
+        return None
+    if not isinstance(driver_id, (str, int)) or len(str(driver_id)) > 64:
+        raise InvalidTrip("Invalid driver_id.")
+    return str(driver_id)
+
+
+def read_driver_plan(data):
+    """
+    The optional `driver_plan` of a generate_logbook payload: the id a
+    previous response returned in X-Driver-Plan, or None.
+    """
+    plan_id = data.get("driver_plan") if isinstance(data, dict) else None
+    if plan_id in (None, ""):
+        return None
+    try:
+        plan_id = int(plan_id)
+    except (TypeError, ValueError):
+        plan_id = 0
+    if plan_id <= 0:
+        raise InvalidTrip("Invalid driver_plan.")
+    return plan_id
+
+
+def plan_recorded(driver_id, plan_id, plan_hash):
+    """Whether `plan_id` is a plan with `plan_hash` already counted in the driver's ledger."""
+    return DriverPlan.objects.filter(
+        pk=plan_id, driver_id=driver_id, plan_hash=plan_hash
+    ).exists()
+
+
+def check_cycle(driver_id, trip, plan_hash, plan_id=None, today=None):
+    """
+    The ledger of `driver_id`, after checking that `trip` fits in the cycle
+    it leaves, and whether the request repeats the recorded plan `plan_id`.
+
+    A repeat is neither checked nor counted again; any other request is,
+    even for a trip the driver was planned before. Raises InvalidTrip.
+    """
+    today = today or timezone.localdate()
+    ledger = driver_ledger(driver_id, today, trip.current_cycle_hour)
+    repeat = plan_id is not None and plan_recorded(driver_id, plan_id, plan_hash)
+    if not repeat:
+        check_cycle_hours(trip, ledger.remaining_minutes(today, trip.rules))
+    return ledger, repeat
+
+
+def record_plan(driver_id, plan_hash, days, ledger, today=None):
+    """
+    Adds the on-duty time of each planned LogDay to the driver's ledger, the
+    first day on `ledger.start_day(today)`, and saves it.
+
+    `ledger` is the one the plan was checked against. If the stored ledger
+    changed in the meantime (another plan for the same driver), the plan is
+    added to the stored one instead. Returns the updated ledger and the id
+    of the recorded plan, which the client sends back as `driver_plan` to
+    ask for the same plan again without counting it twice.
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        record = DriverCycle.objects.select_for_update().filter(driver_id=driver_id).first()
+        if record is not None:
+            ledger = _ledger(record)
+        DriverPlan.objects.filter(
+            driver_id=driver_id, recorded_on__lt=today - timedelta(days=CYCLE_DAYS)
+        ).delete()
+        plan = DriverPlan.objects.create(
+            driver_id=driver_id, plan_hash=plan_hash, recorded_on=today
+        )
+        start = ledger.start_day(today)
+        for offset, day in enumerate(days):
+            ledger.add(start + timedelta(days=offset), on_duty_minutes(day))
+        DriverCycle.objects.update_or_create(
+            driver_id=driver_id,
+            defaults={
+                "window_end": ledger.window_end,
+                "slots": ledger.slots,
+                "total": ledger.total,
+            },
+        )
+    return ledger, plan.pk
@@ -0,0 +1,218 @@
+import json
+import threading
+from array import array
+
+# Row and action strings are stored once here; a day only keeps their codes.
+ROWS = ("off-duty", "sleeper", "driving", "on-duty")
+ROW_CODES = {row: code for code, row in enumerate(ROWS)}
+
+OFF_DUTY, SLEEPER, DRIVING, ON_DUTY = range(len(ROWS))
+
+# Code 0 marks an entry without an "action" key, code 1 an explicit None.
+NO_ACTION = 0
+ACTIONS = [NO_ACTION, None, "Pre-trip/TIV", "30-minute break", "Refueling", "Pickup", "Drop-off"]
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS) if code}
+
+
+def action_code(action):
+    """Returns the code for `action`, registering labels that were not seen before."""
+    code = ACTION_CODES.get(action)
+    if code is None:
+        code = len(ACTIONS)
+        ACTIONS.append(action)
+        ACTION_CODES[action] = code
+    return code
+
+
+class LogDay:
+    """
+    A single day of a logbook, stored as parallel columns.
+
+    `hours` holds the hour of each point, `rows` and `actions` hold codes into
+    ROWS and ACTIONS. Use `to_dict()` to get the JSON shape served by the API.
+
+    Every hour is stored as a float, but a day's first point at hour 0 is
+    served as the integer 0, as the engine has always sent it.
+    """
+
+    __slots__ = (
+        "hours",
+        "rows",
+        "actions",
+        "total_time_traveled",
+        "time_spent_in_off_duty",
+        "time_spent_in_on_duty",
+        "time_spent_in_driving",
+        "time_spent_in_sleeper_berth",
+    )
+
+    def __init__(self, total_time_traveled=0):
+        self.hours = array("d")
+        self.rows = array("B")
+        self.actions = array("B")
+        self.total_time_traveled = total_time_traveled
+        self.time_spent_in_off_duty = 0
+        self.time_spent_in_on_duty = 0
+        self.time_spent_in_driving = 0
+        self.time_spent_in_sleeper_berth = 0
+
+    def __len__(self):
+        return len(self.hours)
+
+    def mark(self, hour, row, action=NO_ACTION):
+        """Appends a point at `hour` on `row`; `action` is a label or NO_ACTION."""
+        self.hours.append(hour)
+        self.rows.append(ROW_CODES[row])
+        self.actions.append(action if action is NO_ACTION else action_code(action))
+
+    def drive_ticks(self, current_hour, ticks, step):
+        """Appends `ticks` driving points `step` hours apart and returns the last hour."""
+        hours = self.hours
+        for _ in range(ticks):
+            current_hour += step
+            hours.append(current_hour)
+        self.rows.frombytes(bytes((DRIVING,)) * ticks)
+        self.actions.frombytes(bytes(ticks))
+        return current_hour
+
+    def extend_driving(self, hour):
+        """
+        Continues the current driving segment to `hour`: a segment keeps only
+        its first and last point, so its length does not add entries.
+        """
+        rows = self.rows
+        actions = self.actions
+        if (
+            len(rows) > 1
+            and rows[-1] == DRIVING
+            and rows[-2] == DRIVING
+            and actions[-1] == NO_ACTION
+            and actions[-2] == NO_ACTION
+        ):
+            self.hours[-1] = hour
+        else:
+            self.mark(hour, "driving")
+
+    def copy(self, total_time_traveled):
+        """A copy of this day that starts at `total_time_traveled` minutes into the trip."""
+        day = LogDay(total_time_traveled)
+        day.hours = self.hours[:]
+        day.rows = self.rows[:]
+        day.actions = self.actions[:]
+        day.set_totals(
+            self.time_spent_in_off_duty,
+            self.time_spent_in_on_duty,
+            self.time_spent_in_driving,
+            self.time_spent_in_sleeper_berth,
+        )
+        return day
+
+    def set_totals(self, off_duty, on_duty, driving, sleeper_berth):
+        self.time_spent_in_off_duty = off_duty
+        self.time_spent_in_on_duty = on_duty
+        self.time_spent_in_driving = driving
+        self.time_spent_in_sleeper_berth = sleeper_berth
+
+    def entries(self):
+        for index, (hour, row, action) in enumerate(zip(self.hours, self.rows, self.actions)):
+            if not index and hour == 0:
+                hour = 0
+            if action == NO_ACTION:
+                yield {"hour": hour, "row": ROWS[row]}
+            else:
+                yield {"hour": hour, "row": ROWS[row], "action": ACTIONS[action]}
+
+    def to_json(self):
+        """The UTF-8 JSON encoding of `to_dict()`, built from pre-encoded fragments."""
+        tails = _entry_tails()
+        hours = _HOUR_JSON
+        width = len(ROWS)
+        entries = [
+            b'{"hour":' + (hours.get(hour) or _hour_json(hour)) + tails[action * width + row]
+            for hour, row, action in zip(self.hours, self.rows, self.actions)
+        ]
+        if entries and self.hours[0] == 0:
+            entries[0] = b'{"hour":0' + tails[self.actions[0] * width + self.rows[0]]
+        return b"".join(
+            (
+                b'{"logbook":[',
+                b",".join(entries),
+                b'],"currentHour":0,"totalTimeTraveled":',
+                _number_json(self.total_time_traveled),
+                b',"timeSpentInOffDuty":',
+                _number_json(self.time_spent_in_off_duty),
+                b',"timeSpentInOnDuty":',
+                _number_json(self.time_spent_in_on_duty),
+                b',"timeSpentInDriving":',
+                _number_json(self.time_spent_in_driving),
+                b',"timeSpentInSleeperBerth":',
+                _number_json(self.time_spent_in_sleeper_berth),
+                b"}",
+            )
+        )
+
+    def to_dict(self):
+        return {
+            "logbook": list(self.entries()),
+            "currentHour": 0,
+            "totalTimeTraveled": self.total_time_traveled,
+            "timeSpentInOffDuty": self.time_spent_in_off_duty,
+            "timeSpentInOnDuty": self.time_spent_in_on_duty,
+            "timeSpentInDriving": self.time_spent_in_driving,
+            "timeSpentInSleeperBerth": self.time_spent_in_sleeper_berth,
+        }
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _number_json(value):
+    return _encode(value) if type(value) is not int else str(value).encode()
+
+
+# Encoded "hour" values, filled on first use; hours fall on a small grid.
+_HOUR_JSON = {}
+
+
+def _hour_json(hour):
+    encoded = _HOUR_JSON[hour] = _encode(hour)
+    return encoded
+
+
+# Everything after the hour of an entry, such as `,"row":"driving"}`, for
+# each action/row pair, indexed by `action * len(ROWS) + row`.
+_ENTRY_TAILS = []
+_entry_tails_lock = threading.Lock()
+
+
+def _entry_tails():
+    """The pre-encoded entry tails, extended when new actions were registered."""
+    if len(_ENTRY_TAILS) < len(ACTIONS) * len(ROWS):
+        with _entry_tails_lock:
+            for code in range(len(_ENTRY_TAILS) // len(ROWS), len(ACTIONS)):
+                for row in ROWS:
+                    entry = {"row": row}
+                    if code != NO_ACTION:
+                        entry["action"] = ACTIONS[code]
+                    _ENTRY_TAILS.append(b"," + _encode(entry)[1:])
+    return _ENTRY_TAILS
+
+
+def encode_days(days):
+    """
+    The JSON array of `day.to_dict()` for each day, encoded as the API's
+    JSONRenderer would, but without building the intermediate dicts.
+    """
+    buffer = bytearray(b"[")
+    for index, day in enumerate(days):
+        if index:
+            buffer += b","
+        buffer += day.to_json()
+    buffer += b"]"
+    return bytes(buffer)
+
+
+def materialize(days):
+    """Converts LogDay objects into the list of dicts returned by the API."""
+    return [day.to_dict() for day in days]
@@ -0,0 +1,244 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import setup_databases, teardown_databases
+
+from logs.benchmarks import (
+    PROFILES,
+    REQUEST_PROFILES,
+    SAMPLE_TRIPS,
+    dispatch_batch,
+    find_regressions,
+    historical_rows,
+    measure_batch,
+    measure_day_access,
+    measure_engine,
+    measure_ingest,
+    measure_load,
+    measure_memory,
+    measure_profiles,
+    measure_rendering,
+    measure_requests,
+    measure_resolutions,
+    measure_summary,
+    measure_sweep,
+    mixed_traffic,
+    synthetic_trips,
+)
+from logs.trips import MAX_TOTAL_DRIVING_TIME
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the logbook engine and the generate_logbook endpoint on synthetic "
+        "trips, and fails when a timing regresses past the threshold. Requests "
+        "go to a test database that is destroyed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=sorted(PROFILES),
+            default=list(PROFILES),
+            help="Synthetic trip profiles to run.",
+        )
+        parser.add_argument(
+            "--trips", type=int, default=50, help="Trips per profile."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of trips in the synthetic dispatch batch.",
+        )
+        parser.add_argument(
+            "--skip-requests",
+            action="store_true",
+            help="Only time the engine, not the full request path.",
+        )
+        parser.add_argument(
+            "--load",
+            type=int,
+            default=0,
+            help=(
+                "Also send this many concurrent requests of mixed short/long trips to "
+                "the sync and async generate_logbook endpoints and report their "
+                "latencies. The async engine runs in worker processes, so how far it "
+                "gets ahead depends on the cores they can use."
+            ),
+        )
+        parser.add_argument(
+            "--ingest",
+            type=int,
+            default=0,
+            help=(
+                "Also import this many synthetic LogEntry rows through the bulk "
+                "endpoint and report rows per second."
+            ),
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument(
+            "--baseline", help="JSON results of a previous run to compare against."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown per trip against the baseline, as a fraction.",
+        )
+
+    def handle(self, *args, **options):
+        #  The requests store plans and import rows; keep them off the real database
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            self.benchmark(options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+    def benchmark(self, options):
+        results = {"engine": {}, "requests": {}, "memory": {}, "rendering": {}}
+        client = Client()
+
+        self.stdout.write(
+            f"{'profile':<22}{'trips':>7}{'ms/trip':>10}{'entries/s':>12}{'peak KiB':>11}"
+        )
+        for profile in options["profiles"]:
+            trips = synthetic_trips(profile, options["trips"])
+            results["engine"][profile] = measure_engine(trips)
+            self.write_timing(f"engine/{profile}", results["engine"][profile])
+            if not options["skip_requests"] and profile in REQUEST_PROFILES:
+                results["requests"][profile] = measure_requests(client, trips)
+                self.write_timing(f"requests/{profile}", results["requests"][profile])
+
+        results["resolution"] = measure_resolutions(
+            synthetic_trips("fuel-heavy", options["trips"], seed=2)
+        )
+        self.stdout.write(f"\n{'resolution':<15}{'ms':>9}{'entries':>9}{'vs 30 min':>11}")
+        for minutes, result in results["resolution"].items():
+            self.stdout.write(
+                f"{f'{minutes} min':<15}{result['seconds'] * 1e3:>9.2f}"
+                f"{result['entries']:>9}{result['slowdown']:>11.2f}"
+            )
+
+        results["profiles"] = measure_profiles(
+            synthetic_trips("fuel-heavy", options["trips"], seed=2)
+        )
+        self.stdout.write(f"\n{'rule profile':<15}{'ms':>9}{'days':>9}{'vs default':>11}")
+        for name, result in results["profiles"].items():
+            self.stdout.write(
+                f"{name:<15}{result['seconds'] * 1e3:>9.2f}"
+                f"{result['days']:>9}{result['relative']:>11.2f}"
+            )
+
+        self.stdout.write(
+            f"\n{'trip':<15}{'days':>6}{'entries':>9}{'dicts (KiB)':>14}{'compact (KiB)':>16}{'ratio':>8}"
+        )
+        for name, trip in SAMPLE_TRIPS.items():
+            result = results["memory"][name] = measure_memory(*trip)
+            self.stdout.write(
+                f"{name:<15}{result['days']:>6}{result['entries']:>9}"
+                f"{result['dict_bytes'] / 1024:>14.1f}{result['compact_bytes'] / 1024:>16.1f}"
+                f"{result['dict_bytes'] / result['compact_bytes']:>8.1f}"
+            )
+
+        self.stdout.write(
+            f"\n{'trip':<15}{'KiB':>9}{'JSONRenderer ms':>17}{'pre-encoded ms':>16}{'speedup':>9}"
+        )
+        for name, trip in SAMPLE_TRIPS.items():
+            result = results["rendering"][name] = measure_rendering(*trip)
+            self.stdout.write(
+                f"{name:<15}{result['bytes'] / 1024:>9.1f}"
+                f"{result['generic_seconds'] * 1e3:>17.3f}{result['encoded_seconds'] * 1e3:>16.3f}"
+                f"{result['generic_seconds'] / result['encoded_seconds']:>9.1f}"
+            )
+
+        result = results["batch"] = measure_batch(dispatch_batch(options["batch_size"]))
+        self.stdout.write(
+            f"\nbatch of {result['trips']} trips: "
+            f"{result['planned']} valid, {result['simulated']} distinct plans simulated"
+        )
+
+        results["summary"] = {}
+        self.stdout.write(f"\n{'summary':<15}{'trips':>7}{'mismatches':>12}")
+        for profile in options["profiles"]:
+            result = results["summary"][profile] = measure_summary(
+                synthetic_trips(profile, options["trips"], seed=1)
+            )
+            self.stdout.write(
+                f"{profile:<15}{result['trips']:>7}{len(result['mismatches']):>12}"
+            )
+            if result["mismatches"]:
+                raise CommandError(
+                    f"Summary mode differs from the engine on {len(result['mismatches'])} "
+                    f"{profile} trips, e.g. {result['mismatches'][0]}"
+                )
+
+        result = results["day_access"] = measure_day_access(SAMPLE_TRIPS["multi-week"])
+        self.stdout.write(
+            f"\nmulti-week single day: day 0 {result['day_0_seconds'] * 1e3:.3f} ms "
+            f"({result['day_0_cold_seconds'] * 1e3:.3f} cold), "
+            f"day 24 {result['day_24_seconds'] * 1e3:.3f} ms "
+            f"({result['day_24_cold_seconds'] * 1e3:.3f} cold), "
+            f"whole plan {result['full_seconds'] * 1e3:.3f} ms"
+        )
+
+        results["sweep"] = {}
+        self.stdout.write(f"\n{'sweep':<15}{'points':>8}{'ms':>9}{'pruned':>8}{'pareto':>8}")
+        for name, trip in SAMPLE_TRIPS.items():
+            #  The sweep endpoint only takes trips generate_logbook accepts
+            if trip[1] > MAX_TOTAL_DRIVING_TIME:
+                continue
+            result = results["sweep"][name] = measure_sweep(trip)
+            self.stdout.write(
+                f"{name:<15}{result['points']:>8}{result['seconds'] * 1e3:>9.1f}"
+                f"{result['pruned']:>8}{result['pareto']:>8}"
+            )
+
+        if options["load"]:
+            results["load"] = {}
+            client = AsyncClient()
+            trips = mixed_traffic(options["load"])
+            self.stdout.write(f"\n{'endpoint':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+            for name, path in (
+                ("generate_logbook", "/api/logs/generate_logbook/"),
+                ("generate_logbook_async", "/api/logs/generate_logbook_async/"),
+            ):
+                result = results["load"][name] = measure_load(client, trips, path)
+                self.stdout.write(
+                    f"{name:<28}{result['p50'] * 1e3:>9.1f}"
+                    f"{result['p95'] * 1e3:>9.1f}{result['p99'] * 1e3:>9.1f}"
+                )
+
+        if options["ingest"]:
+            result = results["ingest"] = measure_ingest(
+                Client(), historical_rows(options["ingest"])
+            )
+            self.stdout.write(
+                f"\ningest of {result['rows']} rows: "
+                f"{result['json_rows_per_second']:.0f} rows/s JSON, "
+                f"{result['csv_rows_per_second']:.0f} rows/s CSV, "
+                f"{result['single_rows_per_second']:.0f} rows/s one POST per row"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                regressions = find_regressions(
+                    results, json.load(baseline), options["threshold"]
+                )
+            if regressions:
+                raise CommandError(
+                    "Performance regressed:\n  " + "\n  ".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def write_timing(self, name, timing):
+        self.stdout.write(
+            f"{name:<22}{timing['trips']:>7}{timing['seconds_per_trip'] * 1e3:>10.3f}"
+            f"{timing['entries_per_second']:>12.0f}{timing['peak_bytes'] / 1024:>11.1f}"
+        )
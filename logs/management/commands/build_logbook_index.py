@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from logs.plan_index import DEFAULTS, PlanIndex
+
+
+class Command(BaseCommand):
+    help = "Precomputes plans for the LOGBOOK_INDEX grid and writes the index file."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            help="Where to write the index. Defaults to LOGBOOK_INDEX['PATH'].",
+        )
+
+    def handle(self, *args, **options):
+        config = {**DEFAULTS, **getattr(settings, "LOGBOOK_INDEX", {})}
+        path = options["output"] or config["PATH"]
+        if not path:
+            raise CommandError("Set LOGBOOK_INDEX['PATH'] or pass --output.")
+
+        start = time.perf_counter()
+        PlanIndex.build(
+            path,
+            config["PICKUP_TIME"],
+            config["DRIVING_TIME"],
+            config["DISTANCE"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {path} in {time.perf_counter() - start:.1f}s")
+        )
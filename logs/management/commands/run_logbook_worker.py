@@ -0,0 +1,34 @@
+import threading
+
+from django.core.management.base import BaseCommand
+
+from logs import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background logbook jobs outside the web processes. Jobs left "
+        "running by a stopped worker are picked up again after STALE_AFTER."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=1, help="Jobs to run at the same time."
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=jobs.work, args=(stop,), daemon=True)
+            for _ in range(options["threads"] - 1)
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Running logbook jobs with {options['threads']} thread(s).")
+        try:
+            jobs.work(stop)
+        except KeyboardInterrupt:
+            stop.set()
+            jobs.pool.wake()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,140 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Trip size buckets by total driving time, in minutes.
+TRIP_SIZES = ((600, "short"), (2400, "medium"), (10080, "long"))
+
+
+def trip_size(total_driving_time):
+    for limit, name in TRIP_SIZES:
+        if total_driving_time <= limit:
+            return name
+    return "multi-week"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """A Prometheus histogram with fixed buckets, kept in process memory."""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = (*self.labels, "le")
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(
+                        f"{self.name}_bucket{_labels(names, (*labels, bound))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "logbook_request_duration_seconds",
+    "Time spent handling logbook API requests.",
+    labels=("route", "status", "trip_size"),
+)
+PHASE_LATENCY = Histogram(
+    "logbook_phase_duration_seconds",
+    "Time spent in each phase of generating a logbook.",
+    labels=("route", "phase"),
+)
+DAYS_GENERATED = Counter(
+    "logbook_days_total", "Logbook days returned.", labels=("route",)
+)
+ENTRIES_GENERATED = Counter(
+    "logbook_entries_total", "Logbook entries returned.", labels=("route",)
+)
+
+REGISTRY = (REQUEST_LATENCY, PHASE_LATENCY, DAYS_GENERATED, ENTRIES_GENERATED)
+
+
+@contextmanager
+def timed(route, phase):
+    """Records how long the block takes as `phase` of `route`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_LATENCY.observe(time.perf_counter() - start, route, phase)
+
+
+def tag_trip_size(request, total_driving_time):
+    """Labels the request's latency with the trip size bucket (see MetricsMiddleware)."""
+    getattr(request, "_request", request).logbook_trip_size = trip_size(total_driving_time)
+
+
+def counted(route, days):
+    """Passes `days` through, counting days and entries as they are produced."""
+    for day in days:
+        DAYS_GENERATED.inc(route)
+        ENTRIES_GENERATED.inc(route, amount=len(day))
+        yield day
+
+
+def count_days(route, days):
+    DAYS_GENERATED.inc(route, amount=len(days))
+    ENTRIES_GENERATED.inc(route, amount=sum(len(day) for day in days))
+
+
+def expose():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,46 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import REQUEST_LATENCY
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every request, labelled with its route, status code
+    and, for logbook requests, the trip size bucket set by the view.
+
+    For streamed responses this is the time until the response starts. Works
+    on both the WSGI and the ASGI stack without a thread hop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+        return response
+
+    def record(self, request, response, start):
+        match = request.resolver_match
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            match.view_name if match is not None else "unmatched",
+            response.status_code,
+            getattr(request, "logbook_trip_size", "none"),
+        )
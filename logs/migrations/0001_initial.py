@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_cycle_hour', models.CharField(max_length=2)),
+                ('total_driving_time', models.CharField(max_length=250)),
+                ('pickup_time', models.CharField(max_length=250)),
+                ('total_distance_miles', models.CharField(max_length=250)),
+            ],
+        ),
+    ]
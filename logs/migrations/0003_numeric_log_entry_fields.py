@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+NUMERIC_FIELDS = ["current_cycle_hour", "total_driving_time", "pickup_time", "total_distance_miles"]
+
+
+def to_count(value):
+    """Reads a stored CharField value as a non-negative integer, 0 if it is not a number."""
+    try:
+        return max(0, int(float(str(value).strip())))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def clean_numeric_values(apps, schema_editor):
+    """Rewrites every value as a plain integer string so the columns can be cast."""
+    LogEntry = apps.get_model("logs", "LogEntry")
+    entries = LogEntry.objects.only("id", *NUMERIC_FIELDS).order_by("id")
+    last_id = 0
+    while True:
+        batch = list(entries.filter(id__gt=last_id)[:2000])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed = []
+        for entry in batch:
+            values = {field: str(to_count(getattr(entry, field))) for field in NUMERIC_FIELDS}
+            if any(getattr(entry, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(entry, field, value)
+                changed.append(entry)
+        LogEntry.objects.bulk_update(changed, NUMERIC_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_logbook_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_numeric_values, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='logentry',
+            name='current_cycle_hour',
+            field=models.PositiveSmallIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='logentry',
+            name='pickup_time',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='logentry',
+            name='total_distance_miles',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='logentry',
+            name='total_driving_time',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+    ]
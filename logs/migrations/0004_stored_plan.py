@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0003_numeric_log_entry_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredPlan',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('engine_version', models.PositiveSmallIntegerField()),
+                ('pickup_time', models.PositiveIntegerField()),
+                ('total_driving_time', models.PositiveIntegerField()),
+                ('total_distance_miles', models.PositiveIntegerField()),
+                ('body', models.BinaryField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0004_stored_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverCycle',
+            fields=[
+                ('driver_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('window_end', models.DateField()),
+                ('slots', models.JSONField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
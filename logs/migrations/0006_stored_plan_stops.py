@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0005_driver_cycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedplan',
+            name='stops',
+            field=models.JSONField(default=list),
+        ),
+    ]
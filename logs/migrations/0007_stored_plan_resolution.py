@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0006_stored_plan_stops'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedplan',
+            name='resolution_minutes',
+            field=models.PositiveSmallIntegerField(default=30),
+        ),
+    ]
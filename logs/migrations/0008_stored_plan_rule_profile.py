@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0007_stored_plan_resolution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedplan',
+            name='rule_profile',
+            field=models.CharField(default='property-70-8', max_length=64),
+        ),
+    ]
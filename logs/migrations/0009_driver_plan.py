@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0008_stored_plan_rule_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('driver_id', models.CharField(max_length=64)),
+                ('plan_hash', models.CharField(max_length=64)),
+                ('recorded_on', models.DateField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('driver_id', 'plan_hash'), name='unique_driver_plan')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0009_driver_plan'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='driverplan',
+            name='unique_driver_plan',
+        ),
+        migrations.AddIndex(
+            model_name='driverplan',
+            index=models.Index(fields=['driver_id', 'recorded_on'], name='driver_plan_recorded'),
+        ),
+    ]
@@ -1,10 +1,110 @@
+import uuid
+
 from django.db import models
 
 class LogEntry(models.Model):
-   current_cycle_hour = models.CharField(max_length=2)
-   total_driving_time = models.CharField(max_length=250)
-   pickup_time = models.CharField(max_length=250)
-   total_distance_miles = models.CharField(max_length=250)
+   current_cycle_hour = models.PositiveSmallIntegerField(db_index=True)
+   total_driving_time = models.PositiveIntegerField(db_index=True)
+   pickup_time = models.PositiveIntegerField(db_index=True)
+   total_distance_miles = models.PositiveIntegerField(db_index=True)
 
    def __str__(self):
         return f"{self.current_cycle_hour}:00"
+
+
+class LogbookJob(models.Model):
+    """A logbook generation request that is planned in the background."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED, db_index=True)
+    trips = models.JSONField()
+    single = models.BooleanField(default=True)
+    trips_completed = models.PositiveIntegerField(default=0)
+    days_completed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class StoredPlan(models.Model):
+    """
+    A generated logbook, addressed by the hash of its normalized inputs and
+    the engine version (see `cache.plan_hash()`), so its content never changes.
+
+    `body` holds the zlib-compressed JSON response; it is empty until the
+    plan is first rendered (streamed plans only record their inputs).
+    """
+
+    hash = models.CharField(max_length=64, primary_key=True)
+    engine_version = models.PositiveSmallIntegerField()
+    pickup_time = models.PositiveIntegerField()
+    total_driving_time = models.PositiveIntegerField()
+    total_distance_miles = models.PositiveIntegerField()
+    stops = models.JSONField(default=list)
+    resolution_minutes = models.PositiveSmallIntegerField(default=30)
+    rule_profile = models.CharField(max_length=64, default="property-70-8")
+    body = models.BinaryField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.hash
+
+
+class DriverCycle(models.Model):
+    """
+    A driver's on-duty minutes for the last eight days (see `ledger.CycleLedger`).
+
+    `slots` is a ring buffer indexed by `date.toordinal() % 8`, `total` its sum,
+    and `window_end` the latest day it holds.
+    """
+
+    driver_id = models.CharField(max_length=64, primary_key=True)
+    window_end = models.DateField()
+    slots = models.JSONField()
+    total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.driver_id}: {self.total} min"
+
+
+class DriverPlan(models.Model):
+    """
+    A plan whose days were added to a driver's ledger.
+
+    Its id is returned in X-Driver-Plan. A request that sends it back as
+    `driver_plan`, for the same driver and plan hash, repeats that plan and
+    is not counted again. Rows older than the ledger's eight days are dropped
+    as new plans are recorded.
+    """
+
+    driver_id = models.CharField(max_length=64)
+    plan_hash = models.CharField(max_length=64)
+    recorded_on = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["driver_id", "recorded_on"], name="driver_plan_recorded"),
+        ]
+
+    def __str__(self):
+        return f"{self.driver_id}: {self.plan_hash}"
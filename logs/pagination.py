@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class LogEntryCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, newest entries first.
+
+    Each page is an indexed range scan from the cursor, so its cost does not
+    grow with the size of the table or how deep the client has paged.
+    """
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
@@ -0,0 +1,222 @@
+import json
+import mmap
+import struct
+import threading
+import zlib
+
+from django.conf import settings
+
+from .autofill_logbook import ENGINE_VERSION, iter_logbook_days
+from .logbook import ACTIONS, ROWS, LogDay
+
+MAGIC = b"LGIX"
+FORMAT_VERSION = 2
+
+# magic, format version, metadata length, crc32 of everything after the header
+HEADER = struct.Struct("<4sHxxII")
+# offset of the plan's first day and number of days, per grid cell
+SLOT = struct.Struct("<QI4x")
+# number of points, which totals are ints (bit i for total i), then the totals:
+# total time traveled, off duty, on duty, driving, sleeper berth
+DAY = struct.Struct("<IB3x5d")
+
+DEFAULTS = {
+    "PATH": None,
+    # Inclusive (start, stop, step) ranges of the indexed inputs.
+    "PICKUP_TIME": (60, 1440, 60),
+    "DRIVING_TIME": (60, 1440, 60),
+    "DISTANCE": (50, 1500, 50),
+}
+
+
+def _axis(start, stop, step):
+    return range(start, stop + 1, step)
+
+
+def _position(axis, value):
+    if value not in axis:
+        return None
+    return axis.index(value)
+
+
+def _pad(length):
+    return -length % 8
+
+
+class PlanIndex:
+    """
+    Precomputed plans for a grid of trip inputs, read through `mmap`.
+
+    The file is written by `build()` (see the build_logbook_index command).
+    Days are returned as LogDay objects whose columns are memoryviews into the
+    mapped file, so nothing is copied until the day is rendered. The index is
+    ignored when its checksum fails or it was built by another engine version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._view = None
+        self._axes = None
+        self._metadata_length = 0
+        self._slots_start = 0
+        self._data_start = 0
+        self.error = None
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, "LOGBOOK_INDEX", {})}
+        return cls(options["PATH"])
+
+    @staticmethod
+    def build(path, pickup_times, driving_times, distances):
+        """Simulates every grid point and writes the index file to `path`."""
+        pickup_axis, driving_axis, distance_axis = (
+            _axis(*pickup_times),
+            _axis(*driving_times),
+            _axis(*distances),
+        )
+        slots = bytearray()
+        data = bytearray()
+        for pickup_time in pickup_axis:
+            for total_driving_time in driving_axis:
+                for total_distance_miles in distance_axis:
+                    start, count = len(data), 0
+                    for day in iter_logbook_days(
+                        pickup_time, total_driving_time, total_distance_miles
+                    ):
+                        totals = (
+                            day.total_time_traveled,
+                            day.time_spent_in_off_duty,
+                            day.time_spent_in_on_duty,
+                            day.time_spent_in_driving,
+                            day.time_spent_in_sleeper_berth,
+                        )
+                        # Ints are encoded without ".0"; the flags keep the
+                        # indexed days byte-identical to the live ones.
+                        ints = sum(
+                            1 << index
+                            for index, total in enumerate(totals)
+                            if type(total) is int
+                        )
+                        data += DAY.pack(len(day), ints, *totals)
+                        data += day.hours.tobytes()
+                        data += day.rows.tobytes()
+                        data += day.actions.tobytes()
+                        data += bytes(_pad(len(data)))
+                        count += 1
+                    slots += SLOT.pack(start, count)
+
+        metadata = json.dumps(
+            {
+                "engine_version": ENGINE_VERSION,
+                "pickup_time": list(pickup_times),
+                "driving_time": list(driving_times),
+                "distance": list(distances),
+                "rows": list(ROWS),
+                "actions": ACTIONS[1:],
+            }
+        ).encode()
+        metadata += b" " * _pad(HEADER.size + len(metadata))
+        body = metadata + slots + data
+        with open(path, "wb") as index_file:
+            index_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(metadata), zlib.crc32(body)))
+            index_file.write(body)
+
+    def _open(self):
+        """Maps and validates the file once; returns False when the index is unusable."""
+        if self._view is not None or self.error is not None:
+            return self._view is not None
+        with self._lock:
+            if self._view is not None or self.error is not None:
+                return self._view is not None
+            try:
+                with open(self.path, "rb") as index_file:
+                    mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, TypeError, ValueError) as error:
+                self.error = f"cannot map {self.path}: {error}"
+                return False
+
+            view = memoryview(mapped)
+            try:
+                metadata = self._validate(view)
+            except (struct.error, ValueError, KeyError) as error:
+                self.error = f"unreadable index: {error}"
+            if self.error is not None:
+                view.release()
+                mapped.close()
+                return False
+
+            self._axes = (
+                _axis(*metadata["pickup_time"]),
+                _axis(*metadata["driving_time"]),
+                _axis(*metadata["distance"]),
+            )
+            self._slots_start = HEADER.size + self._metadata_length
+            self._data_start = (
+                self._slots_start
+                + SLOT.size * len(self._axes[0]) * len(self._axes[1]) * len(self._axes[2])
+            )
+            self._map = mapped
+            self._view = view
+            return True
+
+    def _validate(self, view):
+        """Checks the header, checksum and engine version; sets `error` on failure."""
+        magic, version, metadata_length, checksum = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.error = "not a logbook index"
+            return None
+        if zlib.crc32(view[HEADER.size:]) != checksum:
+            self.error = "checksum mismatch"
+            return None
+        metadata = json.loads(bytes(view[HEADER.size:HEADER.size + metadata_length]))
+        if metadata["engine_version"] != ENGINE_VERSION:
+            self.error = "built by another engine version"
+        elif metadata["rows"] != list(ROWS):
+            self.error = "row codes changed"
+        elif metadata["actions"] != ACTIONS[1:len(metadata["actions"]) + 1]:
+            self.error = "action codes changed"
+        self._metadata_length = metadata_length
+        return metadata
+
+    def lookup(self, pickup_time, total_driving_time, total_distance_miles):
+        """Returns the indexed plan as a list of LogDay objects, or None outside the grid."""
+        if self.path is None or not self._open():
+            return None
+        pickup_axis, driving_axis, distance_axis = self._axes
+        positions = (
+            _position(pickup_axis, pickup_time),
+            _position(driving_axis, total_driving_time),
+            _position(distance_axis, total_distance_miles),
+        )
+        if None in positions:
+            return None
+        pickup, driving, distance = positions
+        cell = (pickup * len(driving_axis) + driving) * len(distance_axis) + distance
+
+        view = self._view
+        offset, count = SLOT.unpack_from(view, self._slots_start + cell * SLOT.size)
+        offset += self._data_start
+        days = []
+        for _ in range(count):
+            points, ints, *totals = DAY.unpack_from(view, offset)
+            offset += DAY.size
+            totals = [
+                int(total) if ints >> index & 1 else total for index, total in enumerate(totals)
+            ]
+            day = LogDay(totals[0])
+            day.set_totals(*totals[1:])
+            day.hours = view[offset:offset + 8 * points].cast("d")
+            offset += 8 * points
+            day.rows = view[offset:offset + points]
+            offset += points
+            day.actions = view[offset:offset + points]
+            offset += points
+            offset += _pad(offset)
+            days.append(day)
+        return days
+
+
+plan_index = PlanIndex.from_settings()
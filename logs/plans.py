@@ -0,0 +1,128 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+from .autofill_logbook import ENGINE_VERSION, Stop
+from .logbook import encode_days
+from .models import StoredPlan
+from .rules import rule_profiles
+from .trips import Trip, plan_day, plan_trip, trip_hash
+
+# Hashes this process has already written with a body, so repeated requests
+# for a popular trip do not write to the database each time.
+RECENTLY_STORED = 4096
+
+_stored = OrderedDict()
+_stored_lock = threading.Lock()
+
+
+def _seen(key):
+    with _stored_lock:
+        if key in _stored:
+            _stored.move_to_end(key)
+            return True
+        return False
+
+
+def _remember(key):
+    with _stored_lock:
+        _stored[key] = None
+        while len(_stored) > RECENTLY_STORED:
+            _stored.popitem(last=False)
+
+
+def etag(plan_hash, day=None):
+    """
+    Strong ETag of a stored plan, or of one of its days; their content never
+    changes for a hash.
+    """
+    if day is not None:
+        return f'"{plan_hash}-{day}"'
+    return f'"{plan_hash}"'
+
+
+def is_stored(plan_hash):
+    """Whether this process has recently stored `plan_hash` with its body; `persist()` skips those."""
+    return _seen(plan_hash)
+
+
+def persist(plan_hash, trip, days=None):
+    """
+    Records the plan of `trip` under `plan_hash`.
+
+    With `days`, the encoded response is stored as well; without (for streamed
+    responses) only the inputs are, and the body is filled on the first GET.
+    """
+    if _seen(plan_hash):
+        return
+    body = zlib.compress(encode_days(days), 1) if days is not None else None
+    plan = StoredPlan(
+        hash=plan_hash,
+        engine_version=ENGINE_VERSION,
+        pickup_time=trip.pickup_time,
+        total_driving_time=trip.total_driving_time,
+        total_distance_miles=trip.total_distance_miles,
+        stops=[list(stop) for stop in trip.stops],
+        resolution_minutes=trip.resolution_minutes,
+        rule_profile=trip.rules.name,
+        body=body,
+    )
+    StoredPlan.objects.bulk_create([plan], ignore_conflicts=True)
+    if body is not None:
+        StoredPlan.objects.filter(hash=plan_hash, body__isnull=True).update(body=body)
+        _remember(plan_hash)
+
+
+def load(plan_hash):
+    """The JSON body stored under `plan_hash`, or None if there is no such plan."""
+    plan = StoredPlan.objects.filter(hash=plan_hash).first()
+    if plan is None:
+        return None
+    if plan.body is not None:
+        return zlib.decompress(plan.body)
+
+    trip = _trip(plan)
+    if trip is None:
+        return None
+    body = encode_days(plan_trip(trip))
+    StoredPlan.objects.filter(hash=plan_hash).update(body=zlib.compress(body, 1))
+    return body
+
+
+def load_day(plan_hash, day):
+    """
+    The JSON body of day `day` alone (as a one-day array), or None if there
+    is no such plan or day. The day is planned from the stored inputs, so the
+    stored body is never decoded.
+    """
+    plan = StoredPlan.objects.filter(hash=plan_hash).defer("body").first()
+    trip = _trip(plan) if plan is not None else None
+    if trip is None:
+        return None
+    log_day = plan_day(trip, day)
+    if log_day is None:
+        return None
+    return encode_days([log_day])
+
+
+def _trip(plan):
+    if plan.engine_version != ENGINE_VERSION:
+        # The inputs were recorded by another engine version; its plan can
+        # no longer be rebuilt here.
+        return None
+    rules = rule_profiles.get(plan.rule_profile)
+    if rules is None:
+        return None
+    trip = Trip(
+        0,
+        plan.total_driving_time,
+        plan.pickup_time,
+        plan.total_distance_miles,
+        tuple(Stop(*stop) for stop in plan.stops),
+        plan.resolution_minutes,
+        rules,
+    )
+    # Nor can it if the profile's limits were changed since.
+    if trip_hash(trip) != plan.hash:
+        return None
+    return trip
@@ -0,0 +1,84 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from . import columnar
+from .logbook import LogDay, encode_days
+from .metrics import timed
+
+
+def ndjson_lines(days):
+    """Encodes each LogDay as one line of JSON, as soon as it is produced."""
+    for day in days:
+        yield day.to_json() + b"\n"
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as newline-delimited JSON, one item per line.
+
+    Anything else, such as an error payload, is rendered as a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return b"".join(
+            json.dumps(item, separators=(",", ":")).encode() + b"\n" for item in items
+        )
+
+
+def is_logbook(data):
+    """Whether `data` is a plan, i.e. a non-empty sequence of LogDay objects."""
+    return isinstance(data, (list, tuple)) and bool(data) and isinstance(data[0], LogDay)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that records its rendering time as the view action's "render" phase."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        view = (renderer_context or {}).get("view")
+        with timed(getattr(view, "action", None) or "unknown", "render"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class LogbookJSONRenderer(TimedJSONRenderer):
+    """
+    TimedJSONRenderer with a fast path for lists of LogDay objects, which are
+    encoded straight from their columns (see `encode_days()`).
+
+    The output is byte for byte what JSONRenderer gives for the materialized days.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not is_logbook(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        view = (renderer_context or {}).get("view")
+        with timed(getattr(view, "action", None) or "unknown", "render"):
+            return encode_days(data)
+
+
+class ColumnarRenderer(TimedJSONRenderer):
+    """
+    Renders plans in the columnar format of `columnar.py`.
+
+    Other payloads, such as errors, are rendered as plain JSON, and the
+    response is then labelled application/json.
+    """
+
+    media_type = columnar.MEDIA_TYPE
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (list, tuple)):
+            data = columnar.encode(data)
+        else:
+            response = (renderer_context or {}).get("response")
+            if response is not None:
+                response["Content-Type"] = "application/json"
+        return super().render(data, accepted_media_type, renderer_context)
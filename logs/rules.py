@@ -0,0 +1,172 @@
+"""
+Hours-of-service rule profiles.
+
+A profile is written in the terms of the regulation: the cycle, the daily
+driving and duty limits, the break and the off-duty reset. It is compiled
+once, when this module is imported, into an immutable RuleProfile whose
+`limits` table holds the thresholds in the units the engine counts them in,
+so the engine reads them without any setup per call.
+
+The built-in profiles can be overridden, and others added, with
+`LOGBOOK_RULES["PROFILES"]`; a profile given there only lists the keys that
+differ from the 70-hour/8-day property profile (or from the built-in profile
+of the same name).
+"""
+
+import hashlib
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .autofill_logbook import LIMITS, LOG_HALF_MINUTE, Limits
+
+# The profile of the engine's historical limits, LIMITS.
+LEGACY_PROFILE = "property-70-8"
+
+DEFAULTS = {
+    "DEFAULT": LEGACY_PROFILE,
+    "PROFILES": {},
+}
+
+# The longest cycle a profile can have: the days a driver's ledger keeps.
+MAX_CYCLE_DAYS = 8
+
+# The engine stops one 30-minute tick short of each hour limit, and refuels
+# this many miles short of the fuel range.
+REFUEL_RESERVE_MILES = 20
+
+# Minutes of driving standing in for "no break required"; never reached.
+NO_BREAK = 10**9
+
+PROPERTY_70_8 = {
+    "cycle_hours": 70,
+    "cycle_days": 8,
+    "driving_hours": 11,
+    "duty_window_hours": 14,
+    "break_after_driving_hours": 8,
+    "off_duty_reset_hours": 10,
+    "day_start_hour": 6.5,
+    "fuel_range_miles": 1000,
+    "fueling_minutes": 30,
+}
+
+BUILTIN_PROFILES = {
+    LEGACY_PROFILE: PROPERTY_70_8,
+    "property-60-7": {**PROPERTY_70_8, "cycle_hours": 60, "cycle_days": 7},
+    # Short-haul drivers (49 CFR 395.1(e)(1)) need no 30-minute break.
+    "short-haul": {**PROPERTY_70_8, "break_after_driving_hours": None},
+}
+
+# `limits` is the engine's Limits table; the other fields are what the cycle
+# check before planning needs.
+RuleProfile = namedtuple(
+    "RuleProfile",
+    ["name", "cycle_hours", "cycle_days", "fuel_range_miles", "fueling_minutes", "limits"],
+)
+
+
+def _half_hours(name, spec, key, low, high):
+    value = spec[key]
+    if (
+        isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or not low <= value <= high
+        or value % LOG_HALF_MINUTE
+    ):
+        raise ImproperlyConfigured(
+            f"Rule profile {name!r}: {key} must be a multiple of 0.5 between {low} and {high}."
+        )
+    return value
+
+
+def _whole(name, spec, key, low, high):
+    value = spec[key]
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ImproperlyConfigured(
+            f"Rule profile {name!r}: {key} must be a whole number between {low} and {high}."
+        )
+    return value
+
+
+def compile_profile(name, spec):
+    """
+    Validates a profile `spec` (the keys of PROPERTY_70_8) and returns its
+    RuleProfile. Raises ImproperlyConfigured when it cannot be planned with.
+    """
+    unknown = set(spec) - set(PROPERTY_70_8)
+    missing = set(PROPERTY_70_8) - set(spec)
+    if unknown or missing:
+        raise ImproperlyConfigured(
+            f"Rule profile {name!r}: unknown keys {sorted(unknown)}, "
+            f"missing keys {sorted(missing)}."
+        )
+
+    driving = _half_hours(name, spec, "driving_hours", 1, 24)
+    window = _half_hours(name, spec, "duty_window_hours", driving, 24)
+    reset = _half_hours(name, spec, "off_duty_reset_hours", 1, 24 - window)
+    start = _half_hours(name, spec, "day_start_hour", LOG_HALF_MINUTE, 24 - window)
+    if spec["break_after_driving_hours"] is None:
+        break_after = NO_BREAK
+    else:
+        break_after = _half_hours(name, spec, "break_after_driving_hours", 1, 24)
+        break_after = (break_after - LOG_HALF_MINUTE) * 60
+
+    # A day starts at day_start_hour, or when the sleeper-berth rest carried
+    # over from the day before ends, and the breaks are off duty, so they
+    # stretch its duty window. Longer days would run past midnight.
+    breaks = int((driving - LOG_HALF_MINUTE) * 60 // break_after)
+    last_hour = max(start, reset - LOG_HALF_MINUTE) + window + breaks * LOG_HALF_MINUTE
+    if last_hour > 24:
+        raise ImproperlyConfigured(
+            f"Rule profile {name!r}: its duty day can end {last_hour:g} hours after "
+            f"midnight; shorten the day start, the off-duty reset, the duty window "
+            f"or the breaks."
+        )
+
+    refuel = _whole(name, spec, "fuel_range_miles", REFUEL_RESERVE_MILES + 1, 100000)
+    refuel -= REFUEL_RESERVE_MILES
+    table = (
+        reset,
+        start,
+        break_after,
+        driving - LOG_HALF_MINUTE,
+        window - LOG_HALF_MINUTE,
+        refuel,
+        (driving - LOG_HALF_MINUTE) * 60,
+        (window - LOG_HALF_MINUTE) * 60,
+    )
+    if table == LIMITS[:-1]:
+        key = LIMITS.key
+    else:
+        key = hashlib.sha256(repr(table).encode()).hexdigest()[:12]
+
+    return RuleProfile(
+        name,
+        _whole(name, spec, "cycle_hours", 1, 24 * MAX_CYCLE_DAYS),
+        _whole(name, spec, "cycle_days", 1, MAX_CYCLE_DAYS),
+        spec["fuel_range_miles"],
+        _whole(name, spec, "fueling_minutes", 1, 24 * 60),
+        Limits(*table, key),
+    )
+
+
+def compile_profiles(overrides):
+    """The built-in profiles with `overrides` applied, compiled, as a read-only mapping."""
+    specs = {name: dict(spec) for name, spec in BUILTIN_PROFILES.items()}
+    for name, spec in overrides.items():
+        specs[name] = {**specs.get(name, PROPERTY_70_8), **spec}
+    return MappingProxyType({name: compile_profile(name, spec) for name, spec in specs.items()})
+
+
+def _load():
+    options = {**DEFAULTS, **getattr(settings, "LOGBOOK_RULES", {})}
+    profiles = compile_profiles(options["PROFILES"])
+    if options["DEFAULT"] not in profiles:
+        raise ImproperlyConfigured(f"Unknown default rule profile {options['DEFAULT']!r}.")
+    return profiles, profiles[options["DEFAULT"]]
+
+
+# Every profile by name, and the one used when a request names none.
+rule_profiles, default_profile = _load()
@@ -1,7 +1,29 @@
 from rest_framework import serializers
-from .models import LogEntry
+from .models import LogEntry, LogbookJob
 
 class LogSerializers(serializers.ModelSerializer):
     class Meta:
         model = LogEntry
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class LogbookJobSerializer(serializers.ModelSerializer):
+    trips_total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LogbookJob
+        fields = [
+            "id",
+            "status",
+            "trips_total",
+            "trips_completed",
+            "days_completed",
+            "result",
+            "error",
+            "created_at",
+            "updated_at",
+            "expires_at",
+        ]
+
+    def get_trips_total(self, job):
+        return len(job.trips)
\ No newline at end of file
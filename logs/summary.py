@@ -0,0 +1,204 @@
+from .autofill_logbook import (
+    HALF_MINUTE,
+    LIMITS,
+    Stop,
+    DayMemo,
+    TripState,
+    day_key,
+    leg_end,
+)
+from .logbook import NO_ACTION
+
+
+class DaySummary:
+    """
+    The totals of a day without its logbook points.
+
+    Takes the place of LogDay in `fill_day()`: marks only count refueling
+    stops and note when the drop-off is done, and a stretch of driving is
+    one addition instead of a point per tick.
+    """
+
+    __slots__ = (
+        "total_time_traveled",
+        "time_spent_in_off_duty",
+        "time_spent_in_on_duty",
+        "time_spent_in_driving",
+        "time_spent_in_sleeper_berth",
+        "fueling_stops",
+        "finish_hour",
+    )
+
+    def __init__(self, total_time_traveled=0):
+        self.total_time_traveled = total_time_traveled
+        self.time_spent_in_off_duty = 0
+        self.time_spent_in_on_duty = 0
+        self.time_spent_in_driving = 0
+        self.time_spent_in_sleeper_berth = 0
+        self.fueling_stops = 0
+        self.finish_hour = None
+
+    def mark(self, hour, row, action=NO_ACTION):
+        if action == "Refueling":
+            self.fueling_stops += 1
+        elif action == "Drop-off":
+            self.finish_hour = hour
+
+    def drive_ticks(self, current_hour, ticks, step):
+        # Hours are multiples of the 30-minute step, so this is exactly the
+        # hour LogDay reaches by adding `step` once per tick.
+        return current_hour + ticks * step
+
+    def extend_driving(self, hour):
+        pass
+
+    def set_totals(self, off_duty, on_duty, driving, sleeper_berth):
+        self.time_spent_in_off_duty = off_duty
+        self.time_spent_in_on_duty = on_duty
+        self.time_spent_in_driving = driving
+        self.time_spent_in_sleeper_berth = sleeper_berth
+
+    def copy(self, total_time_traveled):
+        """A copy of this day that starts at `total_time_traveled` minutes into the trip."""
+        day = DaySummary(total_time_traveled)
+        day.set_totals(
+            self.time_spent_in_off_duty,
+            self.time_spent_in_on_duty,
+            self.time_spent_in_driving,
+            self.time_spent_in_sleeper_berth,
+        )
+        day.fueling_stops = self.fueling_stops
+        return day
+
+    def to_dict(self):
+        """The totals of `LogDay.to_dict()`, without the "logbook" points."""
+        return {
+            "currentHour": 0,
+            "totalTimeTraveled": self.total_time_traveled,
+            "timeSpentInOffDuty": self.time_spent_in_off_duty,
+            "timeSpentInOnDuty": self.time_spent_in_on_duty,
+            "timeSpentInDriving": self.time_spent_in_driving,
+            "timeSpentInSleeperBerth": self.time_spent_in_sleeper_berth,
+        }
+
+
+summary_memo = DayMemo(day_class=DaySummary)
+
+
+def summarize_days(
+    duration_from_current_location_to_pickup,
+    total_time_minutes,
+    total_distance_miles,
+    stops=None,
+    carry_overs=None,
+    resolution_minutes=HALF_MINUTE,
+    limits=LIMITS,
+):
+    """
+    The DaySummary of each day of a trip; the days match those of
+    `iter_logbook_days()` with the same arguments.
+
+    Once the carry-over a day starts from repeats, the days in between form
+    a cycle that repeats unchanged until the leg ends, so every complete
+    repetition that still fits before the next stop or the drop-off is
+    added in one step rather than simulated.
+
+    If `carry_overs` is a list, the carry-over each day starts from is
+    appended to it: the `TripState` arguments after the time traveled.
+    """
+    if stops is None:
+        stops = (Stop(duration_from_current_location_to_pickup, HALF_MINUTE, "Pickup"),)
+    state = TripState()
+    days = []
+    elapsed = []  # Minutes of driving each day of `days` was simulated over.
+    seen = {}  # Index in `days` of the last day that started from each key.
+    while not state.finished:
+        key = day_key(
+            state, total_time_minutes, total_distance_miles, resolution_minutes, limits
+        )
+        start = state.total_time_traveled
+        first = seen.get(key)
+        if first is not None:
+            limit = leg_end(state, stops, total_time_minutes)
+            repeats = _repeats(days, elapsed, first, start, limit)
+            if repeats:
+                period = start - days[first].total_time_traveled
+                cycle = range(first, len(days))
+                for repeat in range(1, repeats + 1):
+                    for index in cycle:
+                        day = days[index]
+                        days.append(day.copy(day.total_time_traveled + repeat * period))
+                        elapsed.append(elapsed[index])
+                        if carry_overs is not None:
+                            carry_overs.append(carry_overs[index])
+                # The carry-over is back to what the cycle started from.
+                state.total_time_traveled = start = start + repeats * period
+                seen.clear()
+
+        next_stop = state.next_stop
+        seen[key] = len(days)
+        if carry_overs is not None:
+            carry_overs.append(key[1:5])
+        days.append(
+            summary_memo.fill_day(
+                state,
+                stops,
+                total_time_minutes,
+                total_distance_miles,
+                resolution_minutes,
+                limits,
+            )
+        )
+        elapsed.append(max(state.total_time_traveled, state.lookahead) - start)
+        if state.next_stop != next_stop:
+            seen.clear()
+    return days
+
+
+def _repeats(days, elapsed, first, start, limit):
+    """
+    How many more times the days from `first` on can repeat before the leg
+    ending at `limit` minutes is reached; each must end its day short of it.
+    """
+    period = start - days[first].total_time_traveled
+    if period <= 0:
+        return 0
+    return max(
+        0,
+        min(
+            (limit - days[index].total_time_traveled - elapsed[index] - 1) // period
+            for index in range(first, len(days))
+        ),
+    )
+
+
+def summarize(days):
+    """
+    The summary response of a plan: day count, fuel stops, the day and hour
+    the drop-off is done, and the totals of the whole trip and of each day.
+    """
+    last = days[-1]
+    return {
+        "days": len(days),
+        "fuelingStops": sum(day.fueling_stops for day in days),
+        "finishDay": len(days) - 1,
+        "finishHour": last.finish_hour,
+        "timeSpentInOffDuty": sum(day.time_spent_in_off_duty for day in days),
+        "timeSpentInOnDuty": sum(day.time_spent_in_on_duty for day in days),
+        "timeSpentInDriving": sum(day.time_spent_in_driving for day in days),
+        "timeSpentInSleeperBerth": sum(day.time_spent_in_sleeper_berth for day in days),
+        "logbooks": [day.to_dict() for day in days],
+    }
+
+
+def summarize_trip(trip, carry_overs=None):
+    """The DaySummary of each day of a validated Trip (see `summarize_days()`)."""
+    return summarize_days(
+        trip.pickup_time,
+        trip.total_driving_time,
+        trip.total_distance_miles,
+        stops=trip.stops or None,
+        carry_overs=carry_overs,
+        resolution_minutes=trip.resolution_minutes,
+        limits=trip.rules.limits,
+    )
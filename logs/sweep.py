@@ -0,0 +1,204 @@
+from collections import namedtuple
+from math import ceil
+
+from .autofill_logbook import (
+    HALF_MINUTE,
+    LOG_HALF_MINUTE,
+    DayMemo,
+    Stop,
+    TripState,
+)
+from .logbook import ACTION_CODES
+from .trips import DROP_OFF_TIME, InvalidTrip, check_cycle_hours, read_trip
+
+MAX_SWEEP_POINTS = 5000
+MAX_SPEED = 120  # mph
+
+Sweep = namedtuple("Sweep", ["trip", "start_offsets", "speeds"])
+
+# One evaluated combination: `on_duty_hours` counts driving time too, and
+# `arrival_hour` is when the drop-off is done, in hours from the midnight
+# the trip starts on.
+Option = namedtuple(
+    "Option",
+    ["start_offset", "speed", "total_driving_time", "days", "on_duty_hours", "arrival_hour"],
+)
+
+
+def _values(data, name, low, high):
+    """Reads a list of numbers, or an inclusive `{"start", "stop", "step"}` range."""
+    spec = data.get(name)
+    try:
+        if isinstance(spec, dict):
+            start, stop = float(spec["start"]), float(spec["stop"])
+            step = float(spec.get("step", 1))
+            if step <= 0 or stop < start:
+                raise InvalidTrip(f"{name} needs start <= stop and a positive step.")
+            count = int((stop - start) / step + 1e-9) + 1
+            if count > MAX_SWEEP_POINTS:
+                raise InvalidTrip(f"The sweep is limited to {MAX_SWEEP_POINTS} points.")
+            values = [start + index * step for index in range(count)]
+        elif isinstance(spec, list) and spec:
+            values = [float(value) for value in spec]
+        else:
+            raise InvalidTrip(f"{name} must be a list of numbers or a start/stop/step range.")
+    except (KeyError, TypeError, ValueError):
+        raise InvalidTrip(f"{name} must be a list of numbers or a start/stop/step range.")
+    if not all(low <= value <= high for value in values):
+        raise InvalidTrip(f"{name} must be between {low:g} and {high:g}.")
+    return sorted(set(values))
+
+
+def read_sweep(data):
+    """
+    Validates a sweep payload and returns it as a Sweep.
+
+    The payload holds the generate_logbook `trip` and the `start_offsets`
+    (hours after midnight the driver starts the pre-trip inspection, on the
+    30-minute grid) and average `speeds` (mph) to try, each a list or an
+    inclusive `{"start", "stop", "step"}` range.
+    """
+    if not isinstance(data, dict):
+        raise InvalidTrip("Expected a JSON object.")
+    trip = read_trip(data.get("trip") or {})
+    # A departure at hour `h` of the first day is the state the engine
+    # resumes from after a sleeper-berth period ending at `h`, so departures
+    # are limited to the hours a sleeper-berth carry-over can express.
+    max_start_offset = trip.rules.limits.max_sleeper_berth - LOG_HALF_MINUTE
+    start_offsets = _values(data, "start_offsets", 0, max_start_offset)
+    if any(offset % LOG_HALF_MINUTE for offset in start_offsets):
+        raise InvalidTrip("start_offsets must be on the 30-minute grid.")
+    speeds = _values(data, "speeds", 1, MAX_SPEED)
+    if len(start_offsets) * len(speeds) > MAX_SWEEP_POINTS:
+        raise InvalidTrip(f"The sweep is limited to {MAX_SWEEP_POINTS} points.")
+    return Sweep(trip, start_offsets, speeds)
+
+
+def at_speed(trip, speed):
+    """
+    `trip` driven at an average of `speed` mph: the driving time changes and
+    the stops keep their place along the route.
+    """
+    total_driving_time = max(1, ceil(trip.total_distance_miles * 60 / speed))
+    scale = total_driving_time / trip.total_driving_time
+    return trip._replace(
+        total_driving_time=total_driving_time,
+        pickup_time=max(1, round(trip.pickup_time * scale)),
+        stops=tuple(
+            stop._replace(arrival=max(1, round(stop.arrival * scale))) for stop in trip.stops
+        ),
+    )
+
+
+def _start_state(start_offset, limits):
+    if start_offset == 0:
+        return TripState(continue_driving=True)
+    return TripState(prev_sleeper_berth_hr=limits.max_sleeper_berth - start_offset)
+
+
+def _dominates(option, days, on_duty_hours, arrival_hour):
+    return (
+        option.days <= days
+        and option.on_duty_hours <= on_duty_hours
+        and option.arrival_hour <= arrival_hour
+    )
+
+
+def _arrival_hour(day):
+    drop_off = ACTION_CODES["Drop-off"]
+    for index in range(len(day.actions) - 1, -1, -1):
+        if day.actions[index] == drop_off:
+            return day.hours[index]
+    return 24
+
+
+def evaluate(trip, start_offset, speed, front, memo):
+    """
+    Simulates `trip` leaving at `start_offset` and returns its Option, or None
+    as soon as an option in `front` is known to be at least as good on every
+    objective.
+
+    After each unfinished day the days, on-duty hours and arrival hour the
+    trip can still reach are bounded from below by what is already logged plus
+    the driving, dwell and drop-off time left, so a dominated combination is
+    dropped without simulating the rest of it.
+    """
+    stops = trip.stops or (Stop(trip.pickup_time, HALF_MINUTE, "Pickup"),)
+    state = _start_state(start_offset, trip.rules.limits)
+    days = 0
+    on_duty_hours = 0
+    while True:
+        day = memo.fill_day(
+            state,
+            stops,
+            trip.total_driving_time,
+            trip.total_distance_miles,
+            trip.resolution_minutes,
+            trip.rules.limits,
+        )
+        days += 1
+        on_duty_hours += day.time_spent_in_on_duty + day.time_spent_in_driving
+        if state.finished:
+            return Option(
+                start_offset,
+                speed,
+                trip.total_driving_time,
+                days,
+                on_duty_hours,
+                (days - 1) * 24 + _arrival_hour(day),
+            )
+        remaining_minutes = (
+            max(0, trip.total_driving_time - state.total_time_traveled)
+            + sum(stop.dwell for stop in stops[state.next_stop:])
+            + DROP_OFF_TIME
+        )
+        least_on_duty = on_duty_hours + remaining_minutes / 60
+        least_arrival = days * 24 + remaining_minutes / 60
+        if any(_dominates(option, days + 1, least_on_duty, least_arrival) for option in front):
+            return None
+
+
+def pareto_front(options):
+    """The options no other option is at least as good as on every objective."""
+    front = []
+    for option in sorted(options, key=lambda o: (o.days, o.arrival_hour, o.on_duty_hours)):
+        if not any(
+            _dominates(kept, option.days, option.on_duty_hours, option.arrival_hour)
+            for kept in front
+        ):
+            front.append(option)
+    return front
+
+
+def run_sweep(sweep):
+    """
+    Evaluates every start offset and speed of a Sweep.
+
+    Faster speeds are tried first, since they tend to find short plans that
+    prune the rest early. Combinations that do not fit in the trip's cycle
+    hours are skipped. Returns the Pareto set of (days, on-duty hours, arrival
+    hour) with the counts of evaluated, pruned and infeasible combinations.
+    """
+    memo = DayMemo()
+    front = []
+    evaluated = pruned = infeasible = 0
+    for speed in sorted(sweep.speeds, reverse=True):
+        trip = at_speed(sweep.trip, speed)
+        try:
+            check_cycle_hours(trip)
+        except InvalidTrip:
+            infeasible += len(sweep.start_offsets)
+            continue
+        for start_offset in sweep.start_offsets:
+            evaluated += 1
+            option = evaluate(trip, start_offset, speed, front, memo)
+            if option is None:
+                pruned += 1
+                continue
+            front = pareto_front(front + [option])
+    return {
+        "evaluated": evaluated,
+        "pruned": pruned,
+        "infeasible": infeasible,
+        "pareto": [option._asdict() for option in front],
+    }
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import random
+import tempfile
+from concurrent.futures import Future
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from . import async_views, checkpoints, columnar, ingest, ledger
+from .autofill_logbook import RESOLUTIONS, Stop, day_memo, fill_logbook_days
+from .cache import logbook_cache
+from .logbook import ACTION_CODES, encode_days, materialize
+from .plan_index import PlanIndex
+from .rules import PROPERTY_70_8, compile_profile, default_profile, rule_profiles
+from .summary import summarize_trip
+from .trips import Trip, clear_day_starts, plan_day, read_trip, simulate, trip_hash, trip_key
+
+
+def sample_trips(rules, count, seed=0):
+    """`count` random trips planned with `rules`, a third of them with stops."""
+    rng = random.Random(seed)
+    trips = []
+    for _ in range(count):
+        total_driving_time = rng.randint(30, 6000)
+        total_distance_miles = max(1, total_driving_time * rng.randint(20, 80) // 60)
+        pickup_time = rng.randint(1, total_driving_time)
+        stops = ()
+        if rng.random() < 0.3:
+            arrivals = sorted(rng.sample(range(1, total_driving_time + 1), 2))
+            stops = tuple(Stop(arrival, 60, "Stop") for arrival in arrivals)
+            pickup_time = arrivals[0]
+        trips.append(
+            Trip(
+                0,
+                total_driving_time,
+                pickup_time,
+                total_distance_miles,
+                stops,
+                rng.choice(RESOLUTIONS),
+                rules,
+            )
+        )
+    return trips
+
+
+def fingerprint(body):
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+class EngineTests(SimpleTestCase):
+    # (pickup time, driving time, distance) and the fingerprint of the plan the
+    # original day-by-day engine made for it, before the memo, the fast-forward
+    # and the compact LogDay. Only trips whose original days all end by
+    # midnight are listed: the others used to drive on past midnight after the
+    # sleeper-berth rest and are planned differently now. The last five rest
+    # and drive on before the drop-off, within the day.
+    ORIGINAL_PLANS = [
+        (60, 120, 100, "88cf70ee73790723"),
+        (30, 30, 30, "1b4d9090e218000e"),
+        (120, 480, 420, "5b3590295a0041c7"),
+        (655, 1005, 4117, "faf73a9bea1f5e3c"),
+        (1723, 1859, 2261, "506845c6c2863563"),
+        (589, 937, 312, "5f850618a589300c"),
+        (872, 983, 1228, "a172bd293a2dc497"),
+        (988, 1196, 1196, "c32b21ce1c6c22cb"),
+        (921, 1228, 24, "be886ac80015dff7"),
+        (495, 2060, 2334, "8ed60211bdaf7cc4"),
+        (278, 1341, 79, "a419701f08d023e7"),
+        (356, 450, 5295, "90358848b5b3ad4d"),
+        (262, 239, 84, "04da7cc6935929d2"),
+        (900, 792, 166, "0bcff6b3d2d7181b"),
+        (225, 1803, 1111, "a0965952b3d8bd2e"),
+        (978, 819, 354, "d4fb79c1fc9b9593"),
+        (365, 525, 533, "5611c6fe21c7d393"),
+        (1038, 900, 2569, "e382b00ff22ca551"),
+        (1289, 2414, 1323, "b2f50ea1ae7f9f04"),
+        (211, 143, 2106, "8c8e986ffc8deba6"),
+        (241, 820, 189, "ad221e1f165230c5"),
+        (448, 502, 73, "e2f82736a63a02f8"),
+        (116, 489, 1329, "15e484c1ac37e5f3"),
+        (129, 335, 323, "f16a06742af60d6e"),
+        (468, 1239, 764, "b9c6c19806073703"),
+        (325, 1569, 106, "97e6b5f215bde604"),
+        (182, 73, 4287, "1b332bbf5829d7c7"),
+        (566, 2201, 5855, "811dd64023ed9e66"),
+        (403, 395, 348, "239f6456a10ec258"),
+        (645, 1501, 4417, "dc9fbdfb53f31ad5"),
+        (2519, 2528, 5763, "92a9954d50479c60"),
+        (1970, 2508, 5706, "ddb0883b6d883d64"),
+        (585, 2548, 2548, "45e30da75f9bdfb2"),
+        (1095, 1885, 1885, "903d61a125b2cdc6"),
+        (298, 1908, 1908, "21b260d489ac8266"),
+    ]
+
+    def test_plans_match_the_original_engine(self):
+        for *trip, expected in self.ORIGINAL_PLANS:
+            self.assertEqual(fingerprint(encode_days(fill_logbook_days(*trip))), expected, trip)
+
+    def test_memo_keeps_days_planned_again_for_longer_trips(self):
+        # The longer trip's second day drives on past midnight after its rest
+        # and is planned again; the shorter one reaches the drop-off first.
+        day_memo.clear()
+        fill_logbook_days(259, 2960, 2960)
+        *trip, expected = self.ORIGINAL_PLANS[-1]
+        self.assertEqual(fingerprint(encode_days(fill_logbook_days(*trip))), expected)
+
+    def test_days_start_at_integer_hour(self):
+        for day in json.loads(encode_days(fill_logbook_days(60, 3000, 2800))):
+            self.assertIs(type(day["logbook"][0]["hour"]), int)
+            self.assertIs(type(day["logbook"][1]["hour"]), float)
+
+    def test_memoized_days_match_simulated_ones(self):
+        trips = sample_trips(default_profile, 100, seed=3)
+        day_memo.clear()
+        cold = [encode_days(simulate(trip)) for trip in trips]
+        self.assertEqual([encode_days(simulate(trip)) for trip in trips], cold)
+        self.assertGreater(day_memo.stats()["hits"], 0)
+
+    def test_pre_encoded_plan_matches_json_renderer(self):
+        for trip in sample_trips(default_profile, 50, seed=4):
+            days = simulate(trip)
+            self.assertEqual(encode_days(days), JSONRenderer().render(materialize(days)))
+
+    def test_indexed_plans_match_simulated_ones(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plans.idx")
+            PlanIndex.build(path, (60, 180, 60), (60, 1440, 460), (50, 1500, 725))
+            index = PlanIndex(path)
+            for pickup_time in range(60, 181, 60):
+                for total_driving_time in range(60, 1441, 460):
+                    for total_distance_miles in range(50, 1501, 725):
+                        trip = (pickup_time, total_driving_time, total_distance_miles)
+                        self.assertEqual(
+                            encode_days(index.lookup(*trip)),
+                            encode_days(fill_logbook_days(*trip)),
+                            trip,
+                        )
+            self.assertIsNone(index.lookup(61, 60, 50))
+
+
+class RuleProfileTests(SimpleTestCase):
+    def assertDaysFit(self, rules):
+        for trip in sample_trips(rules, 150):
+            for day in simulate(trip):
+                self.assertLessEqual(max(day.hours), 24, trip)
+
+    def test_property_70_8_days_fit(self):
+        self.assertDaysFit(rule_profiles["property-70-8"])
+
+    def test_property_60_7_days_fit(self):
+        self.assertDaysFit(rule_profiles["property-60-7"])
+
+    def test_short_haul_days_fit(self):
+        self.assertDaysFit(rule_profiles["short-haul"])
+
+    def test_early_start_and_short_reset_days_fit(self):
+        # Both once logged days of up to 37 hours: the driving limit was
+        # reached early enough to rest and then drive on past midnight.
+        self.assertDaysFit(compile_profile("early", {**PROPERTY_70_8, "day_start_hour": 0.5}))
+        self.assertDaysFit(compile_profile("reset", {**PROPERTY_70_8, "off_duty_reset_hours": 8}))
+
+    def test_breaks_must_fit_in_the_day(self):
+        spec = {
+            **PROPERTY_70_8,
+            "driving_hours": 9.5,
+            "duty_window_hours": 10.5,
+            "off_duty_reset_hours": 1.5,
+            "day_start_hour": 10.5,
+            "break_after_driving_hours": 1,
+        }
+        with self.assertRaises(ImproperlyConfigured):
+            compile_profile("breaks", spec)
+
+
+def totals(day):
+    return (
+        day.total_time_traveled,
+        day.time_spent_in_off_duty,
+        day.time_spent_in_on_duty,
+        day.time_spent_in_driving,
+        day.time_spent_in_sleeper_berth,
+    )
+
+
+class SummaryTests(SimpleTestCase):
+    def test_summary_matches_the_full_plan(self):
+        refueling, drop_off = ACTION_CODES["Refueling"], ACTION_CODES["Drop-off"]
+        for seed, rules in enumerate(rule_profiles.values()):
+            for trip in sample_trips(rules, 300, seed):
+                days = simulate(trip)
+                summaries = summarize_trip(trip)
+                self.assertEqual([totals(day) for day in summaries], [totals(day) for day in days])
+                self.assertEqual(
+                    [day.fueling_stops for day in summaries],
+                    [day.actions.count(refueling) for day in days],
+                )
+                last = days[-1]
+                finish = last.hours[len(last.actions) - 1 - last.actions[::-1].index(drop_off)]
+                self.assertEqual(summaries[-1].finish_hour, finish)
+
+
+class ReplanTests(SimpleTestCase):
+    def test_replan_continues_the_original_plan(self):
+        for seed, rules in enumerate(rule_profiles.values()):
+            for trip in sample_trips(rules, 20, seed):
+                collected = []
+                days = [day.to_json() for day in simulate(trip, checkpoints=collected)]
+                exported = checkpoints.export(
+                    collected,
+                    trip.total_driving_time,
+                    trip.total_distance_miles,
+                    resolution_minutes=trip.resolution_minutes,
+                    rules=rules,
+                )
+                for checkpoint in exported:
+                    replan = checkpoints.read_replan({"checkpoint": checkpoint["token"]})
+                    tail = [day.to_json() for day in checkpoints.iter_replan_days(replan)]
+                    self.assertEqual(tail, days[checkpoint["day"]:], trip)
+
+
+class PlanDayTests(SimpleTestCase):
+    def setUp(self):
+        logbook_cache.clear()
+        clear_day_starts()
+        day_memo.clear()
+
+    def test_single_day_matches_the_full_plan(self):
+        for seed, rules in enumerate(rule_profiles.values()):
+            for trip in sample_trips(rules, 20, seed):
+                days = simulate(trip)
+                for number in reversed(range(len(days))):
+                    self.assertEqual(plan_day(trip, number).to_json(), days[number].to_json())
+                self.assertIsNone(plan_day(trip, len(days)))
+
+
+class LedgerTests(TestCase):
+    def test_each_plan_is_recorded(self):
+        today = date(2026, 10, 18)
+        trip = Trip(0, 3000, 120, 2800, (), 30, default_profile)
+        days = simulate(trip)
+        cycle = ledger.driver_ledger("driver", today)
+        first, first_id = ledger.record_plan("driver", trip_hash(trip), days, cycle, today)
+        recorded = first.total
+        again, again_id = ledger.record_plan("driver", trip_hash(trip), days, first, today)
+        self.assertNotEqual(first_id, again_id)
+        self.assertTrue(ledger.plan_recorded("driver", first_id, trip_hash(trip)))
+        self.assertFalse(ledger.plan_recorded("other", first_id, trip_hash(trip)))
+        self.assertFalse(ledger.plan_recorded("driver", first_id, "0" * 64))
+        self.assertGreater(again.total, recorded)
+        self.assertEqual(ledger.driver_ledger("driver", today).total, again.total)
+
+
+class DriverCycleTests(TestCase):
+    # About 42 on-duty hours: fits in a fresh 70-hour cycle, but not twice.
+    TRIP = {
+        "current_cycle_hour": 0,
+        "total_driving_time": 2400,
+        "pickup_time": 120,
+        "total_distance_miles": 2000,
+        "driver_id": "driver",
+    }
+
+    def generate(self, today, path="/api/logs/generate_logbook/", **payload):
+        with mock.patch("django.utils.timezone.localdate", return_value=today):
+            return self.client.post(
+                path, json.dumps({**self.TRIP, **payload}), content_type="application/json"
+            )
+
+    def assertChargedOnEachDay(self, path):
+        first = self.generate(date(2026, 10, 19), path)
+        self.assertEqual(first.status_code, 200)
+        # Sending the plan back repeats it without counting it again.
+        repeat = self.generate(date(2026, 10, 19), path, driver_plan=first["X-Driver-Plan"])
+        self.assertEqual(repeat.status_code, 200)
+        self.assertEqual(repeat["X-Driver-Plan"], first["X-Driver-Plan"])
+        self.assertEqual(repeat["X-Cycle-Remaining-Minutes"], first["X-Cycle-Remaining-Minutes"])
+        # The same trip the next day is a new plan, and no longer fits.
+        second = self.generate(date(2026, 10, 20), path)
+        self.assertEqual(second.status_code, 400)
+
+    def test_same_trip_on_two_days(self):
+        self.assertChargedOnEachDay("/api/logs/generate_logbook/")
+
+    def test_same_trip_on_two_days_async(self):
+        self.assertChargedOnEachDay("/api/logs/generate_logbook_async/")
+
+
+class IngestTests(SimpleTestCase):
+    HEADER = b"current_cycle_hour,total_driving_time,pickup_time,total_distance_miles\n"
+
+    def assertIngestError(self, rows, message):
+        with self.assertRaisesMessage(ingest.IngestError, message):
+            list(rows)
+
+    def test_json_invalid_utf8_names_the_byte(self):
+        body = b'[{"current_cycle_hour": 1}, "\xff"]'
+        offset = body.index(b"\xff")
+        self.assertIngestError(ingest.iter_json_rows(io.BytesIO(body)), f"at byte {offset}.")
+
+    def test_csv_invalid_utf8_names_the_line(self):
+        body = self.HEADER + b"1,60,30,50\n\xff,1,1,1\n"
+        self.assertIngestError(ingest.iter_csv_rows(io.BytesIO(body)), "Line 3 ")
+
+    def test_csv_error_names_the_line(self):
+        body = self.HEADER + b"1,60,30,50\n1,60,30," + b"5" * 200000 + b"\n"
+        self.assertIngestError(ingest.iter_csv_rows(io.BytesIO(body)), "Line 3 ")
+
+
+class ColumnarTests(TestCase):
+    TRIP = {
+        "current_cycle_hour": 0,
+        "total_driving_time": 3000,
+        "pickup_time": 120,
+        "total_distance_miles": 2800,
+    }
+
+    def generate(self, query=""):
+        return self.client.post(
+            "/api/logs/generate_logbook/" + query,
+            json.dumps(self.TRIP),
+            content_type="application/json",
+            HTTP_ACCEPT=columnar.MEDIA_TYPE,
+        )
+
+    def test_plan_is_columnar(self):
+        response = self.generate()
+        self.assertEqual(response["Content-Type"], columnar.MEDIA_TYPE)
+        plain = self.client.post(
+            "/api/logs/generate_logbook/", json.dumps(self.TRIP), content_type="application/json"
+        )
+        self.assertEqual(columnar.decode(json.loads(response.content)), plain.json())
+
+    def test_plan_with_checkpoints_is_json(self):
+        response = self.generate("?checkpoints=1")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("checkpoints", response.json())
+
+
+class PlanTests(TestCase):
+    def get(self, plan_hash, query=""):
+        etag = f'"{plan_hash}-{query[5:]}"' if query else f'"{plan_hash}"'
+        return self.client.get(f"/api/logs/plans/{plan_hash}/{query}", HTTP_IF_NONE_MATCH=etag)
+
+    def test_matching_etag_is_not_modified(self):
+        # A trip no other test plans: persist() skips hashes it stored before.
+        trip = {**ColumnarTests.TRIP, "pickup_time": 121}
+        response = self.client.post(
+            "/api/logs/generate_logbook/", json.dumps(trip), content_type="application/json"
+        )
+        key = response["X-Logbook-Plan"]
+        self.assertEqual(self.get(key).status_code, 304)
+        self.assertEqual(self.get(key, "?day=0").status_code, 304)
+        # Matching ETags of plans or days that do not exist are not found.
+        self.assertEqual(self.get(key, f"?day={len(response.json())}").status_code, 404)
+        self.assertEqual(self.get("0" * 64).status_code, 404)
+
+
+class AsyncSlotTests(SimpleTestCase):
+    def test_slot_is_held_until_the_simulation_finishes(self):
+        async def run():
+            slots = async_views._concurrency_slots()
+            await slots.acquire()
+            future = Future()
+            future.set_running_or_notify_cancel()
+            async_views._release_when_done(future, slots, asyncio.get_running_loop())
+            # A running simulation cannot be cancelled: the slot stays taken.
+            self.assertFalse(future.cancel())
+            await asyncio.sleep(0)
+            held = slots.locked()
+            future.set_result([])
+            await asyncio.sleep(0)
+            return held, slots.locked()
+
+        with self.settings(LOGBOOK_ASYNC={"MAX_CONCURRENCY": 1}):
+            self.assertEqual(asyncio.run(run()), (True, False))
+
+    def test_each_event_loop_has_its_own_slots(self):
+        async def slots():
+            return async_views._concurrency_slots()
+
+        self.assertIsNot(asyncio.run(slots()), asyncio.run(slots()))
+
+    def test_cached_and_stored_plan_is_served_without_a_thread_hop(self):
+        data = {
+            "current_cycle_hour": 5,
+            "total_driving_time": 1213,
+            "pickup_time": 97,
+            "total_distance_miles": 905,
+        }
+        trip = read_trip(data)
+        days = logbook_cache.set(trip_key(trip), simulate(trip))
+        hop = mock.Mock(side_effect=AssertionError("thread hop"))
+        with mock.patch.object(async_views, "sync_to_async", hop), mock.patch(
+            "logs.plans.is_stored", return_value=True
+        ):
+            response = self.client.post(
+                "/api/logs/generate_logbook_async/", data, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, encode_days(days))
+        hop.assert_not_called()
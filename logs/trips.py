@@ -0,0 +1,340 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+from .autofill_logbook import (
+    HALF_MINUTE,
+    RESOLUTIONS,
+    Stop,
+    TripState,
+    day_memo,
+    iter_logbook_days,
+)
+from .cache import logbook_cache, plan_hash, plan_key
+from .logbook import materialize
+from .plan_index import plan_index
+from .rules import MAX_CYCLE_DAYS, default_profile, rule_profiles
+from .summary import summarize_trip
+
+PICK_UP_AND_DROP_OFF_TIME = 60  # 60 minutes
+DROP_OFF_TIME = 30
+
+# Longest trip accepted, in minutes of driving: more than fits in any cycle.
+# The engine's run time grows with the trip, so this bounds every request.
+MAX_TOTAL_DRIVING_TIME = MAX_CYCLE_DAYS * 24 * 60
+
+MAX_STOPS = 50
+# Most payloads a batch request may plan; larger sets go through a job.
+MAX_BATCH_TRIPS = 1000
+MAX_DWELL_TIME = 4 * 60  # 4 hours
+# Stop types accepted in a payload, and the logbook action each is logged with.
+STOP_ACTIONS = {"pickup": "Pickup", "drop-off": "Drop-off", "stop": "Stop"}
+
+# Trips whose day starts `day_starts()` keeps, most recently used last.
+DAY_STARTS_ENTRIES = 1024
+
+# `stops` holds the Stop tuples of a multi-stop trip; it is empty for the
+# single pickup at `pickup_time`. `resolution_minutes` is the engine's tick
+# and `rules` the RuleProfile the trip is planned under.
+Trip = namedtuple(
+    "Trip",
+    [
+        "current_cycle_hour",
+        "total_driving_time",
+        "pickup_time",
+        "total_distance_miles",
+        "stops",
+        "resolution_minutes",
+        "rules",
+    ],
+    defaults=[(), HALF_MINUTE, default_profile],
+)
+
+
+class InvalidTrip(Exception):
+    """Raised when a trip payload cannot be planned; the message is returned to the client."""
+
+
+def parse_trip(data):
+    """
+    Validates a generate_logbook payload and returns it as a Trip.
+
+    Raises InvalidTrip with the error message served by the API.
+    """
+    trip = read_trip(data)
+    check_cycle_hours(trip)
+    return trip
+
+
+def read_trip(data):
+    """Converts a payload to a Trip, checking the values but not the cycle hours."""
+    try:
+        # Extract and convert data to integers
+        resolution_minutes = int(data.get("resolution_minutes", HALF_MINUTE))
+        if resolution_minutes not in RESOLUTIONS:
+            raise InvalidTrip(
+                f"resolution_minutes must be one of {', '.join(map(str, RESOLUTIONS))}."
+            )
+        rules = read_rule_profile(data.get("rule_profile"))
+        stops = read_stops(data.get("stops"), resolution_minutes)
+        trip = Trip(
+            current_cycle_hour=int(data.get("current_cycle_hour", 0)),
+            total_driving_time=int(data.get("total_driving_time", 0)),
+            pickup_time=stops[0].arrival if stops else int(data.get("pickup_time", 0)),
+            total_distance_miles=int(data.get("total_distance_miles", 0)),
+            stops=stops,
+            resolution_minutes=resolution_minutes,
+            rules=rules,
+        )
+    except (ValueError, TypeError, AttributeError, KeyError):
+        raise InvalidTrip("Invalid input format. Expected numeric values.")
+
+    #  Validate input values (ensure no zero values)
+    if any(
+        val <= 0
+        for val in [
+            trip.total_driving_time,
+            trip.pickup_time,
+            trip.total_distance_miles,
+        ]
+    ):
+        raise InvalidTrip("Invalid input values. All fields must be greater than zero.")
+    if not 0 <= trip.current_cycle_hour <= rules.cycle_hours:
+        raise InvalidTrip(f"current_cycle_hour must be between 0 and {rules.cycle_hours}.")
+    if max(trip.total_driving_time, trip.pickup_time) > MAX_TOTAL_DRIVING_TIME:
+        raise InvalidTrip(
+            f"total_driving_time and pickup_time must be at most {MAX_TOTAL_DRIVING_TIME}."
+        )
+    if trip.stops and trip.stops[-1].arrival > trip.total_driving_time:
+        raise InvalidTrip("Stops must be reached within total_driving_time.")
+
+    return trip
+
+
+def read_rule_profile(name):
+    """The RuleProfile named `name`, or the default profile when it is None."""
+    if name is None:
+        return default_profile
+    rules = rule_profiles.get(name) if isinstance(name, str) else None
+    if rules is None:
+        raise InvalidTrip(f"rule_profile must be one of: {', '.join(rule_profiles)}.")
+    return rules
+
+
+def read_stops(stops, resolution_minutes=HALF_MINUTE):
+    """
+    Converts the optional `stops` of a payload to a tuple of Stop.
+
+    Each stop is `{"arrival": minutes of driving from the start, "dwell":
+    minutes on duty, "type": "pickup" | "drop-off" | "stop"}`, in the order
+    they are made. Dwell times are rounded up to the plan's resolution.
+    """
+    if stops is None:
+        return ()
+    if not isinstance(stops, list) or not 0 < len(stops) <= MAX_STOPS:
+        raise InvalidTrip(f"Expected a list of 1 to {MAX_STOPS} stops.")
+    result = []
+    for stop in stops:
+        arrival = int(stop["arrival"])
+        dwell = int(stop.get("dwell", HALF_MINUTE))
+        action = STOP_ACTIONS.get(stop.get("type", "pickup"))
+        if action is None:
+            raise InvalidTrip(f"Stop type must be one of: {', '.join(STOP_ACTIONS)}.")
+        if arrival <= 0 or not 0 < dwell <= MAX_DWELL_TIME:
+            raise InvalidTrip(
+                f"Stops need a positive arrival and a dwell of 1 to {MAX_DWELL_TIME} minutes."
+            )
+        if result and arrival < result[-1].arrival:
+            raise InvalidTrip("Stops must be in order of arrival.")
+        dwell = -(-dwell // resolution_minutes) * resolution_minutes
+        result.append(Stop(arrival, dwell, action))
+    return tuple(result)
+
+
+def check_cycle_hours(trip, remaining_minutes=None):
+    """
+    Raises InvalidTrip unless the trip fits in the driver's remaining cycle hours.
+
+    These come from the trip's `current_cycle_hour` and the cycle of its rule
+    profile unless `remaining_minutes` is given, e.g. from the driver's ledger.
+    """
+    rules = trip.rules
+    if remaining_minutes is None:
+        remaining_minutes = (rules.cycle_hours - trip.current_cycle_hour) * 60
+    remaining_cycle_hours = remaining_minutes
+    num_fueling_stops = trip.total_distance_miles // rules.fuel_range_miles
+
+    total_time_to_refuel = num_fueling_stops * rules.fueling_minutes
+    if trip.stops:
+        stop_time = sum(stop.dwell for stop in trip.stops) + DROP_OFF_TIME
+    else:
+        stop_time = PICK_UP_AND_DROP_OFF_TIME
+    # The engine drives on to the pickup even when it lies past the drop-off.
+    driving_time = max(trip.total_driving_time, trip.pickup_time)
+    total_on_duty_time = driving_time + total_time_to_refuel + stop_time
+
+    if remaining_cycle_hours < total_on_duty_time:
+        raise InvalidTrip("You do not have enough cycle hours to complete this trip")
+
+
+def trip_key(trip):
+    """
+    Cache key of a Trip; the cycle hours do not change the plan, so profiles
+    that only differ in their cycle share plans.
+    """
+    return plan_key(
+        trip.pickup_time,
+        trip.total_driving_time,
+        trip.total_distance_miles,
+        trip.stops,
+        trip.resolution_minutes,
+        trip.rules.limits.key,
+    )
+
+
+def trip_hash(trip):
+    """Content address of a Trip's plan (see `cache.plan_hash()`)."""
+    return plan_hash(
+        trip.pickup_time,
+        trip.total_driving_time,
+        trip.total_distance_miles,
+        trip.stops,
+        trip.resolution_minutes,
+        trip.rules.limits.key,
+    )
+
+
+def _indexed_plan(trip):
+    # The precomputed index only holds single-pickup trips at 30 minutes,
+    # planned with the default limits.
+    if trip.stops or trip.resolution_minutes != HALF_MINUTE or trip.rules.limits.key:
+        return None
+    return plan_index.lookup(trip.pickup_time, trip.total_driving_time, trip.total_distance_miles)
+
+
+def simulate(trip, checkpoints=None):
+    """
+    Runs the engine for a Trip and returns its LogDay objects, collecting the
+    day checkpoints into `checkpoints` if it is a list.
+    """
+    return list(
+        iter_logbook_days(
+            total_time_minutes=trip.total_driving_time,
+            duration_from_current_location_to_pickup=trip.pickup_time,
+            total_distance_miles=trip.total_distance_miles,
+            stops=trip.stops or None,
+            checkpoints=checkpoints,
+            resolution_minutes=trip.resolution_minutes,
+            limits=trip.rules.limits,
+        )
+    )
+
+
+def stored_plan(trip):
+    """The plan from the precomputed index or the cache, or None if it must be simulated."""
+    days = _indexed_plan(trip)
+    if days is not None:
+        return days
+    return logbook_cache.get(trip_key(trip))
+
+
+def plan_trip(trip):
+    """
+    Returns the LogDay objects for a validated Trip.
+
+    Looks in the precomputed plan index first, then in the cache, and only
+    runs the engine when neither has the plan.
+    """
+    days = _indexed_plan(trip)
+    if days is not None:
+        return days
+    return logbook_cache.get_or_build(trip_key(trip), lambda: simulate(trip))
+
+
+_day_starts = OrderedDict()
+_day_starts_lock = threading.Lock()
+
+
+def day_starts(trip):
+    """
+    The `TripState` arguments each day of a Trip's plan starts from.
+
+    They are found in summary mode (see `summary.summarize_days()`), without
+    building any logbook, and kept for the DAY_STARTS_ENTRIES most recent
+    trips, so paging through the days of a plan only summarizes it once.
+    """
+    key = trip_key(trip)
+    with _day_starts_lock:
+        starts = _day_starts.get(key)
+        if starts is not None:
+            _day_starts.move_to_end(key)
+            return starts
+
+    carry_overs = []
+    summaries = summarize_trip(trip, carry_overs=carry_overs)
+    starts = tuple(
+        (day.total_time_traveled, *carry_over) for day, carry_over in zip(summaries, carry_overs)
+    )
+    with _day_starts_lock:
+        _day_starts[key] = starts
+        while len(_day_starts) > DAY_STARTS_ENTRIES:
+            _day_starts.popitem(last=False)
+    return starts
+
+
+def clear_day_starts():
+    with _day_starts_lock:
+        _day_starts.clear()
+
+
+def plan_day(trip, day):
+    """
+    The LogDay of day `day` (counted from 0) of a Trip's plan, or None past
+    its last day.
+
+    Unless the whole plan is indexed or cached, only that day is simulated,
+    from the carry-over `day_starts()` gives for it.
+    """
+    days = stored_plan(trip)
+    if days is not None:
+        return days[day] if day < len(days) else None
+    starts = day_starts(trip)
+    if day >= len(starts):
+        return None
+    stops = trip.stops or (Stop(trip.pickup_time, HALF_MINUTE, "Pickup"),)
+    return day_memo.fill_day(
+        TripState(*starts[day]),
+        stops,
+        trip.total_driving_time,
+        trip.total_distance_miles,
+        trip.resolution_minutes,
+        trip.rules.limits,
+    )
+
+
+def plan_distinct(payloads):
+    """
+    Plans a list of generate_logbook payloads, simulating each distinct plan
+    once.
+
+    Returns one result per payload, in input order: `{"logbooks": [...]}` on
+    success or `{"error": ..., "logbooks": []}` for an invalid trip. Each
+    trip is planned like a single request, one after the other; payloads
+    with the same plan key (e.g. differing in their cycle hours alone) share
+    the first one's result. This is request de-duplication, not a faster
+    engine: a batch of distinct trips takes as long as planning them one by
+    one.
+    """
+    plans = {}
+    results = []
+    for data in payloads:
+        try:
+            trip = parse_trip(data)
+        except InvalidTrip as error:
+            results.append({"error": str(error), "logbooks": []})
+            continue
+
+        key = trip_key(trip)
+        if key not in plans:
+            plans[key] = materialize(plan_trip(trip))
+        results.append({"logbooks": plans[key]})
+    return results
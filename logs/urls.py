@@ -1,10 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LogEntryViewSet
+from .views import LogEntryViewSet, LogbookJobViewSet
+from .async_views import generate_logbook_async
 
 router = DefaultRouter()
 router.register(r"logs", LogEntryViewSet)
+router.register(r"jobs", LogbookJobViewSet)
 
 urlpatterns = [
+    path(
+        "logs/generate_logbook_async/",
+        generate_logbook_async,
+        name="logentry-generate-logbook-async",
+    ),
     path("", include(router.urls))
 ]
@@ -1,76 +1,437 @@
+import io
+
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework import viewsets, permissions
+from rest_framework import mixins, viewsets, permissions
 from rest_framework.decorators import action
-from .models import LogEntry
-from .serializers import LogSerializers
-from .autofill_logbook import auto_fill_logbook
+from rest_framework.renderers import BrowsableAPIRenderer
+from .models import LogEntry, LogbookJob
+from .pagination import LogEntryCursorPagination
+from .serializers import LogSerializers, LogbookJobSerializer
+from .autofill_logbook import day_memo, iter_logbook_days
+from .cache import logbook_cache
+from .logbook import materialize
+from . import checkpoints, ingest, jobs, ledger, metrics, plans, summary, sweep
+from .renderers import (
+    ColumnarRenderer,
+    LogbookJSONRenderer,
+    NDJSONRenderer,
+    ndjson_lines,
+)
+from .trips import (
+    MAX_BATCH_TRIPS,
+    InvalidTrip,
+    check_cycle_hours,
+    plan_day,
+    plan_distinct,
+    plan_trip,
+    read_rule_profile,
+    read_trip,
+    simulate,
+    stored_plan,
+    trip_hash,
+)
+
+
+# Fields of LogEntry that the list endpoint can filter by value or range,
+# e.g. `?total_driving_time__gte=600&total_driving_time__lt=1200`.
+RANGE_FILTER_FIELDS = (
+    "current_cycle_hour",
+    "total_driving_time",
+    "pickup_time",
+    "total_distance_miles",
+)
+RANGE_LOOKUPS = ("", "__gt", "__gte", "__lt", "__lte")
+
+
+def wants_stream(request):
+    """Streaming is opted into with `?stream=1` or `Accept: application/x-ndjson`."""
+    if request.query_params.get("stream") in ("1", "true"):
+        return True
+    return isinstance(request.accepted_renderer, NDJSONRenderer)
+
+
+def plan_headers(trip):
+    """Headers pointing to the stored copy of the trip's plan at GET /api/logs/plans/<hash>/."""
+    key = trip_hash(trip)
+    return key, {
+        "X-Logbook-Plan": key,
+        "Content-Location": reverse("logentry-plan", kwargs={"plan_hash": key}),
+    }
+
+
+def wants_summary(request):
+    """Only the totals, without the logbook points, are returned with `?detail=summary`."""
+    return request.query_params.get("detail") == "summary"
+
+
+def read_day(request):
+    """The day asked for with `?day=N`, counted from 0, or None for the whole plan."""
+    value = request.query_params.get("day")
+    if value is None:
+        return None
+    try:
+        day = int(value)
+    except ValueError:
+        day = -1
+    if day < 0:
+        raise InvalidTrip("day must be a whole number of 0 or more.")
+    return day
+
+
+def wants_checkpoints(request):
+    """Day checkpoints for `replan` are returned with `?checkpoints=1`."""
+    return request.query_params.get("checkpoints") in ("1", "true")
+
+
+def prometheus_metrics(request):
+    """Request latency, phase timings and output counters in Prometheus text format."""
+    return HttpResponse(metrics.expose(), content_type="text/plain; version=0.0.4")
+
 
 class LogEntryViewSet(viewsets.ModelViewSet):
     queryset = LogEntry.objects.all()
     serializer_class = LogSerializers
     permission_classes = [permissions.AllowAny]
+    pagination_class = LogEntryCursorPagination
 
-    @action(detail=False, methods=["post"])
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+        filters = {}
+        for field in RANGE_FILTER_FIELDS:
+            for lookup in RANGE_LOOKUPS:
+                value = self.request.query_params.get(field + lookup)
+                if value is None:
+                    continue
+                try:
+                    filters[field + lookup] = int(value)
+                except ValueError:
+                    raise ValidationError({field + lookup: "Expected an integer."})
+        return queryset.filter(**filters)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        renderer_classes=[
+            LogbookJSONRenderer,
+            BrowsableAPIRenderer,
+            NDJSONRenderer,
+            ColumnarRenderer,
+        ],
+    )
     def generate_logbook(self, request):
-        data = request.data
+        route = "generate_logbook"
+        today = timezone.localdate()
+        cycle = None
         try:
-            # Extract and convert data to integers
-            current_cycle_hour = int(data.get("current_cycle_hour", 0))
-            total_driving_time = int(data.get("total_driving_time", 0))
-            pickup_time = int(data.get("pickup_time", 0))
-            total_distance_miles = int(data.get("total_distance_miles", 0))
-
-            #  Validate input values (ensure no zero values)
-            if any(
-                val <= 0
-                for val in [
-                    total_driving_time,
-                    pickup_time,
-                    total_distance_miles,
-                ]
-            ):
+            with metrics.timed(route, "parse"):
+                trip = read_trip(request.data)
+                driver_id = ledger.read_driver_id(request.data)
+                driver_plan = ledger.read_driver_plan(request.data)
+                day = read_day(request)
+            metrics.tag_trip_size(request, trip.total_driving_time)
+            key, headers = plan_headers(trip)
+            with metrics.timed(route, "cycle_check"):
+                #  With a driver_id the cycle hours come from the driver's ledger;
+                #  a request that sends back the plan it was given is not counted again
+                if driver_id is not None:
+                    cycle, repeat = ledger.check_cycle(driver_id, trip, key, driver_plan, today)
+                else:
+                    check_cycle_hours(trip)
+        except InvalidTrip as error:
+            return Response({"error": str(error), "logbooks": []}, status=400)
+
+        #  Only whole plans are added to the driver's ledger; a single day,
+        #  the totals or a stream of the plan just report the cycle left
+        if cycle is not None:
+            headers.update(self.cycle_headers(trip, cycle, today))
+            if repeat:
+                headers["X-Driver-Plan"] = str(driver_plan)
+
+        #  Totals only: every day is still simulated, but the response leaves
+        #  out the logbook points
+        if wants_summary(request):
+            with metrics.timed(route, "simulate"):
+                days = summary.summarize_trip(trip)
+            with metrics.timed(route, "persist"):
+                plans.persist(key, trip)
+            return Response(summary.summarize(days), headers=headers)
+
+        #  A single day: earlier days are only fast-forwarded through
+        if day is not None:
+            with metrics.timed(route, "simulate"):
+                log_day = plan_day(trip, day)
+            if log_day is None:
                 return Response(
-                    {
-                        "error": "Invalid input values. All fields must be greater than zero.",
-                        "logbooks": [],
-                    },
-                    status=400,
+                    {"error": "The plan has no such day.", "logbooks": []}, status=404
                 )
+            with metrics.timed(route, "persist"):
+                plans.persist(key, trip)
+            return self.logbook_response(request, route, [log_day], headers=headers)
 
-            remaining_cycle_hours = (70 - current_cycle_hour) * 60
-            pick_up_and_drop_off_time = 60  # 60 minutes
-            num_fueling_stops = total_distance_miles // 1000
+        #  Stream each day as soon as it is complete when NDJSON is requested
+        if wants_stream(request):
+            days = stored_plan(trip)
+            with metrics.timed(route, "persist"):
+                plans.persist(key, trip, days)
+            days = days or iter_logbook_days(
+                total_time_minutes=trip.total_driving_time,
+                duration_from_current_location_to_pickup=trip.pickup_time,
+                total_distance_miles=trip.total_distance_miles,
+                stops=trip.stops or None,
+                resolution_minutes=trip.resolution_minutes,
+                limits=trip.rules.limits,
+            )
+            response = StreamingHttpResponse(
+                ndjson_lines(metrics.counted(route, days)),
+                content_type=NDJSONRenderer.media_type,
+            )
+            for name, value in headers.items():
+                response[name] = value
+            return response
 
-            total_time_to_refuel = (
-                num_fueling_stops * 30
-            )  # Assuming refuelling takes 30 minutes
-            total_on_duty_time = (
-                total_driving_time + total_time_to_refuel + pick_up_and_drop_off_time
+        #  Generate logbook data; checkpoints are only known when simulating
+        day_checkpoints = [] if wants_checkpoints(request) else None
+        with metrics.timed(route, "simulate"):
+            if day_checkpoints is None:
+                days = plan_trip(trip)
+            else:
+                days = simulate(trip, day_checkpoints)
+        metrics.count_days(route, days)
+        with metrics.timed(route, "persist"):
+            plans.persist(key, trip, days)
+            if cycle is not None and not repeat:
+                headers.update(self.record_cycle(driver_id, key, trip, days, cycle, today))
+        if day_checkpoints is not None:
+            day_checkpoints = checkpoints.export(
+                day_checkpoints,
+                trip.total_driving_time,
+                trip.total_distance_miles,
+                resolution_minutes=trip.resolution_minutes,
+                rules=trip.rules,
             )
+        return self.logbook_response(request, route, days, day_checkpoints, headers)
 
-            if remaining_cycle_hours < total_on_duty_time:
-                return Response(
-                    {
-                        "error": "You do not have enough cycle hours to complete this trip",
-                        "logbooks": [],
-                    },
-                    status=400,
-                )
+    def logbook_response(self, request, route, days, day_checkpoints=None, headers=None):
+        """The days in the negotiated format, wrapped with their checkpoints if any."""
+        if day_checkpoints is not None:
+            with metrics.timed(route, "materialize"):
+                logbooks = materialize(days)
+            return Response(
+                {"logbooks": logbooks, "checkpoints": day_checkpoints}, headers=headers
+            )
+        #  The JSON and columnar renderers encode LogDay objects directly
+        if isinstance(request.accepted_renderer, (LogbookJSONRenderer, ColumnarRenderer)):
+            return Response(days, headers=headers)
+        with metrics.timed(route, "materialize"):
+            logbooks = materialize(days)
+        return Response(logbooks, headers=headers)
 
-            #  Generate logbook data
-            logbooks = auto_fill_logbook(
-                total_time_minutes=total_driving_time,
-                duration_from_current_location_to_pickup=pickup_time,
-                total_distance_miles=total_distance_miles,
+    @action(
+        detail=False,
+        methods=["post"],
+        renderer_classes=[LogbookJSONRenderer, BrowsableAPIRenderer, ColumnarRenderer],
+    )
+    def replan(self, request):
+        """
+        Plans the rest of a trip from a day checkpoint of an earlier plan.
+
+        Takes `{"checkpoint": token}` plus, optionally, the updated
+        `remaining_driving_time`, `remaining_distance_miles` and `stops` (see
+        `checkpoints.read_replan()`), and returns the days from the checkpoint
+        on. Only the remaining trip is simulated.
+        """
+        route = "replan"
+        try:
+            with metrics.timed(route, "parse"):
+                replan = checkpoints.read_replan(request.data)
+        except InvalidTrip as error:
+            return Response({"error": str(error), "logbooks": []}, status=400)
+
+        day_checkpoints = [] if wants_checkpoints(request) else None
+        with metrics.timed(route, "simulate"):
+            days = list(checkpoints.iter_replan_days(replan, day_checkpoints))
+        metrics.count_days(route, days)
+        if day_checkpoints is not None:
+            day_checkpoints = checkpoints.export(
+                day_checkpoints,
+                replan.total_driving_time,
+                replan.total_distance_miles,
+                first_day=replan.day,
+                resolution_minutes=replan.resolution_minutes,
+                rules=replan.rules,
             )
+        return self.logbook_response(request, route, days, day_checkpoints)
+
+    @action(detail=False, methods=["post"])
+    def sweep(self, request):
+        """
+        Tries a trip at every combination of departure hour and average speed.
+
+        Takes `{"trip": <generate_logbook payload>, "start_offsets": [...],
+        "speeds": [...]}` (see `sweep.read_sweep()`) and returns the Pareto
+        set of the options by days used, on-duty hours and arrival hour.
+        """
+        route = "sweep"
+        try:
+            with metrics.timed(route, "parse"):
+                options = sweep.read_sweep(request.data)
+        except InvalidTrip as error:
+            return Response({"error": str(error), "pareto": []}, status=400)
+        with metrics.timed(route, "simulate"):
+            return Response(sweep.run_sweep(options))
 
-            return Response(logbooks)
+    def record_cycle(self, driver_id, key, trip, days, cycle, today):
+        """Writes the plan's days to the driver's ledger; returns the headers reporting it."""
+        cycle, plan_id = ledger.record_plan(driver_id, key, days, cycle, today)
+        return {**self.cycle_headers(trip, cycle, today), "X-Driver-Plan": str(plan_id)}
 
-        except ValueError:
+    def cycle_headers(self, trip, cycle, today):
+        """Reports the cycle minutes left in the driver's ledger `cycle`."""
+        return {"X-Cycle-Remaining-Minutes": str(cycle.remaining_minutes(today, trip.rules))}
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"drivers/(?P<driver_id>[^/]{1,64})/cycle",
+        url_name="driver-cycle",
+    )
+    def driver_cycle(self, request, driver_id):
+        """
+        Cycle minutes used and left for a driver's next plan, from their
+        ledger, in the cycle of the `?rule_profile=` given or the default one.
+        """
+        try:
+            rules = read_rule_profile(request.query_params.get("rule_profile"))
+        except InvalidTrip as error:
+            return Response({"error": str(error)}, status=400)
+        today = timezone.localdate()
+        cycle = ledger.driver_ledger(driver_id, today)
+        start = cycle.start_day(today)
+        return Response(
+            {
+                "driver_id": driver_id,
+                "rule_profile": rules.name,
+                "start_day": start,
+                "used_minutes": cycle.used_minutes(start, rules.cycle_days),
+                "remaining_minutes": cycle.remaining_minutes(today, rules),
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"plans/(?P<plan_hash>[0-9a-f]{64})",
+        url_name="plan",
+    )
+    def plan(self, request, plan_hash):
+        """
+        A plan stored by generate_logbook, by the hash it returned in X-Logbook-Plan.
+
+        Plans never change, so the hash is a strong ETag and clients may cache
+        them forever; a matching If-None-Match gets 304 Not Modified, once the
+        plan or day is known to exist. With `?day=N` only that day is
+        returned, as a one-day array.
+        """
+        try:
+            day = read_day(request)
+        except InvalidTrip as error:
+            return Response({"error": str(error)}, status=400)
+        if day is None:
+            body = plans.load(plan_hash)
+        else:
+            body = plans.load_day(plan_hash, day)
+        if body is None:
+            return Response({"error": "No plan with this hash or day."}, status=404)
+        etag = plans.etag(plan_hash, day)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Imports log entries from a JSON array or, with `Content-Type: text/csv`,
+        a CSV file with a header row. The body is read as a stream and written
+        in batched transactions; invalid rows are skipped and reported.
+        """
+        stream = request.stream or io.BytesIO()
+        if request.content_type.startswith("text/csv"):
+            rows = ingest.iter_csv_rows(stream)
+        else:
+            rows = ingest.iter_json_rows(stream)
+        result = ingest.ingest(rows)
+        return Response(result, status=400 if "error" in result else 201)
+
+    @action(detail=False, methods=["post"])
+    def generate_logbooks_batch(self, request):
+        """
+        Plans a JSON array of generate_logbook payloads; results keep the input
+        order and repeated plans are simulated once.
+        """
+        trips = request.data
+        if isinstance(trips, dict):
+            trips = trips.get("trips")
+        if not isinstance(trips, list):
+            return Response(
+                {"error": "Expected a list of trips.", "results": []},
+                status=400,
+            )
+        if len(trips) > MAX_BATCH_TRIPS:
             return Response(
                 {
-                    "error": "Invalid input format. Expected numeric values.",
-                    "logbooks": [],
+                    "error": f"A batch holds at most {MAX_BATCH_TRIPS} trips; "
+                    "submit larger sets as a job.",
+                    "results": [],
                 },
                 status=400,
             )
+        return Response({"results": plan_distinct(trips)})
+
+    @action(detail=False, methods=["get"])
+    def cache_stats(self, request):
+        """Hit/miss counters of the generated plan cache and of the day memo."""
+        return Response({**logbook_cache.stats(), "days": day_memo.stats()})
+
+
+class LogbookJobViewSet(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """
+    Background logbook generation.
+
+    POST a generate_logbook payload (or a list of them, or {"trips": [...]})
+    to get a job id back right away, then GET the job to follow its progress
+    and read the result once its status is "done".
+    """
+
+    queryset = LogbookJob.objects.all()
+    serializer_class = LogbookJobSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def create(self, request):
+        trips = request.data
+        single = isinstance(trips, dict) and "trips" not in trips
+        if single:
+            trips = [trips]
+        elif isinstance(trips, dict):
+            trips = trips.get("trips")
+        if not isinstance(trips, list) or not trips:
+            return Response({"error": "Expected a trip or a list of trips."}, status=400)
+
+        job = jobs.submit(trips, single)
+        return Response(
+            self.get_serializer(job).data,
+            status=202,
+            headers={"Location": f"{request.path.rstrip('/')}/{job.id}/"},
+        )